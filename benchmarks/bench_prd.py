@@ -0,0 +1,139 @@
+"""Throughput / latency benchmark for ``generate_prd`` against the local mock node.
+
+Starts :mod:`benchmarks.mock_server` in-process, points every advisor at it and
+generates PRDs at each concurrency level, reporting p50/p95/p99 latency and
+PRDs per second::
+
+    python -m benchmarks.bench_prd --concurrency 1,8,32 --requests 64 \\
+        --latency-median 0.3 --error-rate 0.02 --stream
+
+Every request uses a fresh product idea so the response cache and in-flight
+coalescing do not flatter the numbers; pass ``--repeat-ideas`` to measure them
+instead. ``--json`` writes the results for comparison between runs.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+from typing import Any, Dict, List
+
+from gaia_prd import PRDRequest, agents, generate_prd
+from gaia_prd.budget import MODES
+from gaia_prd.client import aclose_client
+
+from .mock_server import BackgroundServer, add_settings_arguments, settings_from_args
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_level(concurrency: int, requests: int, args: argparse.Namespace) -> Dict[str, Any]:
+    selected = {key: key in args.agents.split(",") for key in agents}
+    latencies: List[float] = []
+    advisor_errors = 0
+    failures = 0
+    counter = iter(range(requests))
+
+    def on_update(agent_key: str, text: str) -> None:
+        pass
+
+    async def worker() -> None:
+        nonlocal advisor_errors, failures
+        for number in counter:
+            idea = f"Benchmark idea {number}" if args.repeat_ideas else f"Benchmark idea {uuid.uuid4().hex}"
+            started = time.perf_counter()
+            try:
+                response = await generate_prd(
+                    PRDRequest(product_idea=idea),
+                    selected,
+                    on_update=on_update if args.stream else None,
+                    use_cache=args.repeat_ideas,
+                    deadline=args.deadline,
+                    debate=args.debate,
+                    mode=args.mode,
+                )
+            except Exception:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            advisor_errors += len(response.errors)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "elapsed": round(elapsed, 3),
+        "prds_per_second": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "p50": round(percentile(latencies, 0.50), 3),
+        "p95": round(percentile(latencies, 0.95), 3),
+        "p99": round(percentile(latencies, 0.99), 3),
+        "mean": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "failures": failures,
+        "advisor_errors": advisor_errors,
+    }
+
+
+async def run(args: argparse.Namespace, server: BackgroundServer) -> List[Dict[str, Any]]:
+    for key in agents:
+        agents.override(key, url=server.endpoint(key), fallback_urls=[])
+    results = []
+    try:
+        for concurrency in (int(level) for level in args.concurrency.split(",")):
+            if args.warmup:
+                await run_level(concurrency, min(args.warmup, args.requests), args)
+            result = await run_level(concurrency, args.requests, args)
+            results.append(result)
+            print(
+                f"{result['concurrency']:>11} {result['prds_per_second']:>8.2f} {result['p50']:>7.2f} "
+                f"{result['p95']:>7.2f} {result['p99']:>7.2f} {result['failures']:>8} {result['advisor_errors']:>14}",
+                flush=True,
+            )
+    finally:
+        await aclose_client()
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_prd", description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="PRDs generated per level")
+    parser.add_argument("--warmup", type=int, default=4, help="PRDs generated before each level is measured")
+    parser.add_argument("--agents", default=",".join(agents), help="comma-separated advisors to consult")
+    parser.add_argument("--stream", action="store_true", help="stream advisor output (SSE path)")
+    parser.add_argument("--deadline", type=float, help="PRD deadline in seconds")
+    parser.add_argument("--mode", choices=MODES, default="full", help="output budget of the advisors")
+    parser.add_argument("--debate", action="store_true", help="two debate rounds plus a synthesis per PRD")
+    parser.add_argument("--repeat-ideas", action="store_true", help="reuse ideas and the response cache")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    add_settings_arguments(parser)
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    settings = settings_from_args(args)
+    server = BackgroundServer(settings).start()
+    print(f"mock node: {server.base_url} ({settings.model_dump_json()})", file=sys.stderr)
+    print(f"{'concurrency':>11} {'PRDs/s':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'failures':>8} {'advisor errors':>14}")
+    try:
+        results = asyncio.run(run(args, server))
+    finally:
+        server.stop()
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump({"settings": settings.model_dump(), "stream": args.stream, "results": results}, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""End-to-end load test of the Streamlit app with many simulated sessions.
+
+Each simulated user is a headless Streamlit session (``AppTest``) on its own
+thread, all in this one process, so they share the background loop, caches
+and scheduler like the sessions of a real server. ``AppTest`` installs a
+process-wide runtime for each script run, so reruns take turns; the PRD
+jobs they start run concurrently as usual. A session loads the page, picks one of the example prompts, submits the
+form and reruns the script every ``--poll`` seconds (as the live panel does)
+until the PRD is shown. Advisors are pointed at an in-process
+:mod:`benchmarks.mock_server`::
+
+    python -m benchmarks.loadtest --sessions 1,8,32 --ramp-up 2 --latency-median 0.3
+
+For every level it reports completed sessions per second, the end-to-end
+latency curve (p50/p90/p95/p99), the p95 time of a single script rerun and
+the memory each live session adds to the process. Ideas get a per-session
+suffix so the response cache does not flatter the numbers; pass
+``--repeat-ideas`` to measure it instead. ``--json`` keeps the results.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+from streamlit.testing.v1 import AppTest
+
+import gaia_prd.history
+from gaia_prd import agents
+
+from .bench_prd import percentile
+from .mock_server import BackgroundServer, add_settings_arguments, settings_from_args
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+EXAMPLES = 5
+
+# AppTest swaps the global Runtime instance in and out around every script run
+_script_lock = threading.Lock()
+
+
+class SessionResult(BaseModel):
+    ok: bool
+    latency: float
+    reruns: List[float] = []
+    error: Optional[str] = None
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak size where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in bytes on macOS, kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_session(number: int, delay: float, args: argparse.Namespace, keep: List[AppTest]) -> SessionResult:
+    time.sleep(delay)
+    started = time.perf_counter()
+    reruns: List[float] = []
+
+    def rerun(app: AppTest) -> AppTest:
+        with _script_lock:
+            began = time.perf_counter()
+            app.run()
+            reruns.append(time.perf_counter() - began)
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+        return app
+
+    try:
+        app = AppTest.from_file(APP, default_timeout=args.timeout)
+        keep.append(app)
+        rerun(app)
+        # Pick an example the way a user would, then make it this session's own
+        app.button(key=f"example_{number % EXAMPLES + 1}").click()
+        rerun(app)
+        idea = app.session_state.product_idea
+        if not args.repeat_ideas:
+            idea = f"{idea} (load test session {number}, {random.getrandbits(32):08x})"
+        app.text_area[0].input(idea)
+        next(button for button in app.button if button.label.startswith("Generate PRD")).click()
+        rerun(app)
+
+        deadline = started + args.timeout
+        while app.session_state.prd_job is not None:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"no PRD within {args.timeout:g}s")
+            time.sleep(args.poll)
+            rerun(app)
+        if app.session_state.prd_error or not app.session_state.prd_generated:
+            raise RuntimeError(app.session_state.prd_error or "no PRD shown")
+    except Exception as e:
+        return SessionResult(ok=False, latency=time.perf_counter() - started, reruns=reruns, error=str(e))
+    return SessionResult(ok=True, latency=time.perf_counter() - started, reruns=reruns)
+
+
+def run_level(sessions: int, args: argparse.Namespace) -> Dict[str, Any]:
+    gc.collect()
+    baseline = rss_bytes()
+    keep: List[AppTest] = []
+    lock = threading.Lock()
+    live_peak = baseline
+
+    def session(number: int) -> SessionResult:
+        nonlocal live_peak
+        result = run_session(number, args.ramp_up * number / sessions, args, keep)
+        with lock:
+            live_peak = max(live_peak, rss_bytes())
+        return result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="session") as pool:
+        results = list(pool.map(session, range(sessions)))
+    elapsed = time.perf_counter() - started
+    # Every session is still alive here, as it would be on a server
+    per_session = max(0, max(live_peak, rss_bytes()) - baseline) / sessions
+    keep.clear()
+    gc.collect()
+
+    latencies = [result.latency for result in results if result.ok]
+    reruns = [duration for result in results for duration in result.reruns]
+    errors = sorted({result.error for result in results if result.error})
+    return {
+        "sessions": sessions,
+        "elapsed": round(elapsed, 3),
+        "sessions_per_second": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "p50": round(percentile(latencies, 0.50), 3),
+        "p90": round(percentile(latencies, 0.90), 3),
+        "p95": round(percentile(latencies, 0.95), 3),
+        "p99": round(percentile(latencies, 0.99), 3),
+        "mean": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "rerun_p95": round(percentile(reruns, 0.95), 3),
+        "reruns": len(reruns),
+        "memory_per_session_mb": round(per_session / 2**20, 2),
+        "failures": len(results) - len(latencies),
+        "errors": errors[:5],
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default="1,4,16", help="comma-separated numbers of concurrent sessions")
+    parser.add_argument("--ramp-up", type=float, default=1.0, help="seconds over which each level's sessions arrive")
+    parser.add_argument("--poll", type=float, default=0.5, help="seconds between reruns while a PRD is running")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds before a session counts as failed")
+    parser.add_argument("--repeat-ideas", action="store_true", help="submit the examples verbatim and use the cache")
+    parser.add_argument("--history", action="store_true", help="record the PRDs in the PRD history (GAIA_HISTORY_DB)")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    add_settings_arguments(parser)
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    settings = settings_from_args(args)
+    server = BackgroundServer(settings).start()
+    for key in agents:
+        agents.override(key, url=server.endpoint(key), fallback_urls=[])
+    if not args.history:
+        # The app reads the store at every rerun; keep load-test PRDs out of it
+        gaia_prd.history.history = None
+    print(f"mock node: {server.base_url} ({settings.model_dump_json()})", file=sys.stderr)
+    # Sessions are created outside a script run, which Streamlit warns about each
+    # time; a filter, because Streamlit resets its loggers' levels on config changes
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda record: "missing ScriptRunContext" not in record.getMessage()
+    )
+    # An untimed session first, so imports and first-run caches do not land on the first level
+    run_level(1, args)
+    print(
+        f"{'sessions':>8} {'sessions/s':>10} {'p50':>7} {'p90':>7} {'p95':>7} {'p99':>7} "
+        f"{'rerun p95':>9} {'MB/session':>10} {'failures':>8}"
+    )
+    results = []
+    try:
+        for sessions in (int(level) for level in args.sessions.split(",")):
+            result = run_level(sessions, args)
+            results.append(result)
+            print(
+                f"{result['sessions']:>8} {result['sessions_per_second']:>10.2f} {result['p50']:>7.2f} "
+                f"{result['p90']:>7.2f} {result['p95']:>7.2f} {result['p99']:>7.2f} {result['rerun_p95']:>9.3f} "
+                f"{result['memory_per_session_mb']:>10.2f} {result['failures']:>8}",
+                flush=True,
+            )
+            for error in result["errors"]:
+                print(f"  error: {error}", file=sys.stderr)
+    finally:
+        server.stop()
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump({"settings": settings.model_dump(), "results": results}, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
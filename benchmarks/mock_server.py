@@ -0,0 +1,164 @@
+"""Local stand-in for a Gaia / OpenAI-compatible chat-completions node.
+
+Every request draws its behaviour at random from the configured rates:
+
+- an HTTP error (``--error-rate``; 500/502/503/429)
+- a malformed JSON body (``--malformed-rate``), exercising the non-JSON path in ``analyze``
+- a plain-text body (``--plain-text-rate``), like nodes that ignore the schema
+- otherwise a normal completion: JSON, or SSE chunks when ``"stream": true``
+
+Time to first byte follows a log-normal distribution around ``--latency-median``
+and tokens are produced at ``--tokens-per-second``. Any path is accepted, so
+each advisor can get its own endpoint (and circuit breaker) on one server::
+
+    python -m benchmarks.mock_server --port 9000 --latency-median 0.8 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from typing import AsyncIterator, Optional
+
+import uvicorn
+from pydantic import BaseModel
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+WORDS = (
+    "opportunity market users scale focus value design growth moat product team customers "
+    "revenue simple platform network trust data launch iterate build compete margin"
+).split()
+
+
+class MockSettings(BaseModel):
+    latency_median: float = 0.5
+    latency_sigma: float = 0.4
+    tokens_per_second: float = 200.0
+    completion_tokens: int = 300
+    error_rate: float = 0.0
+    malformed_rate: float = 0.0
+    plain_text_rate: float = 0.0
+    seed: Optional[int] = None
+
+
+class MockServer:
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self.random = random.Random(settings.seed)
+        self.requests = 0
+        self.app = Starlette(routes=[Route("/{path:path}", self.handle, methods=["POST"])])
+
+    def ttfb(self) -> float:
+        settings = self.settings
+        return settings.latency_median * math.exp(self.random.gauss(0, settings.latency_sigma))
+
+    def completion(self, tokens: int) -> str:
+        return " ".join(self.random.choice(WORDS) for _ in range(tokens)).capitalize() + "."
+
+    async def handle(self, request: Request) -> Response:
+        self.requests += 1
+        settings = self.settings
+        body = await request.json()
+        tokens = min(settings.completion_tokens, int(body.get("max_tokens") or settings.completion_tokens))
+        roll = self.random.random()
+        await asyncio.sleep(self.ttfb())
+
+        if roll < settings.error_rate:
+            status = self.random.choice([500, 502, 503, 429])
+            return PlainTextResponse(f"mock error {status}", status_code=status)
+        roll -= settings.error_rate
+        if roll < settings.malformed_rate:
+            return Response('{"choices": [{"message": {"content": "truncated', media_type="application/json")
+        roll -= settings.malformed_rate
+        if roll < settings.plain_text_rate:
+            await asyncio.sleep(tokens / settings.tokens_per_second)
+            return PlainTextResponse(self.completion(tokens))
+
+        usage = {"prompt_tokens": len(json.dumps(body.get("messages", []))) // 4, "completion_tokens": tokens}
+        if body.get("stream"):
+            return StreamingResponse(self.stream(tokens, usage), media_type="text/event-stream")
+        await asyncio.sleep(tokens / settings.tokens_per_second)
+        return JSONResponse({
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.completion(tokens)}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    async def stream(self, tokens: int, usage: dict) -> AsyncIterator[str]:
+        # Emit a few tokens per chunk so high token rates do not become one sleep per token
+        per_chunk = max(1, int(self.settings.tokens_per_second // 20))
+        sent = 0
+        while sent < tokens:
+            count = min(per_chunk, tokens - sent)
+            words = " ".join(self.random.choice(WORDS) for _ in range(count))
+            chunk = {"choices": [{"index": 0, "delta": {"content": ("" if sent == 0 else " ") + words}}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            sent += count
+            await asyncio.sleep(count / self.settings.tokens_per_second)
+        yield f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n"
+        yield "data: [DONE]\n\n"
+
+
+class BackgroundServer:
+    """Run a :class:`MockServer` under uvicorn on a daemon thread"""
+
+    def __init__(self, settings: MockSettings, host: str = "127.0.0.1", port: int = 0):
+        self.mock = MockServer(settings)
+        self.server = uvicorn.Server(uvicorn.Config(
+            self.mock.app, host=host, port=port, log_level="warning", access_log=False, lifespan="off", backlog=4096
+        ))
+        self.thread = threading.Thread(target=self.server.run, name="mock-gaia", daemon=True)
+
+    def start(self) -> "BackgroundServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def endpoint(self, name: str) -> str:
+        return f"{self.base_url}/{name}/v1/chat/completions"
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(5)
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = MockSettings()
+    parser.add_argument("--latency-median", type=float, default=defaults.latency_median, help="median seconds to first byte")
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma, help="log-normal spread of the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--malformed-rate", type=float, default=defaults.malformed_rate)
+    parser.add_argument("--plain-text-rate", type=float, default=defaults.plain_text_rate)
+    parser.add_argument("--seed", type=int)
+
+
+def settings_from_args(args: argparse.Namespace) -> MockSettings:
+    return MockSettings(**{field: getattr(args, field) for field in MockSettings.model_fields})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock Gaia / OpenAI-compatible chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(MockServer(settings_from_args(args)).app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""Core (Streamlit-free) building blocks for the Gaia PRD generator."""
+from .advisors import Advisor, advisors
+from .agent import GaiaAgent, agents
+from .client import configure, get_client
+from .models import AgentResponse, PRDRequest, PRDResponse
+from .prd import advisory_titles, generate_prd, prd_context
+from .render import Document, Section, render, stream
+from .runtime import Submission, get_loop, run, shutdown, start, submit
@@ -0,0 +1,156 @@
+"""Registry of the advisory panel.
+
+Everything the prompts, the PRD templates and the UI need to know about an
+advisor is read from a TOML file (``advisors.toml`` next to this module, or
+``GAIA_ADVISORS_FILE``), so adding one is a matter of adding a table. The
+file is read on first use and again whenever it changes on disk, at most
+every ``GAIA_ADVISORS_CHECK_INTERVAL`` seconds; an edit that does not parse
+leaves the previous panel in place and is reported in ``advisors.error``.
+"""
+import os
+import threading
+import time
+import tomllib
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from .config import env_float, env_str
+
+DEFAULT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "advisors.toml")
+
+
+class Advisor(BaseModel):
+    key: str
+    name: str
+    emoji: str
+    # Expertise given to the model in the prompt
+    perspective: str
+    url: str
+    fallback_urls: List[str] = []
+    # Heading of the advisor's section in the PRD, e.g. "Innovation & Scaling"
+    section: str
+    # One-word theme used in analysis and insight titles, e.g. "Innovation"
+    theme: str
+    # Short label and usage tip for the advisor picker
+    focus: str
+    tip: str = ""
+    model: str = "gpt-3.5-turbo"
+    temperature: float = 0.7
+    # Cap on this advisor's completions; it is asked for fewer words to fit
+    max_tokens: Optional[int] = None
+    # Seconds before hedging / giving up (default GAIA_SOFT_DEADLINE / GAIA_HARD_DEADLINE)
+    soft_deadline: Optional[float] = None
+    hard_deadline: Optional[float] = None
+    # Optional caps on this advisor's concurrent calls and calls per second
+    concurrency: Optional[int] = None
+    rate: Optional[float] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.emoji} {self.name} AI"
+
+    @property
+    def section_title(self) -> str:
+        return f"{self.emoji} {self.section} Perspective ({self.name})"
+
+    @property
+    def analysis_title(self) -> str:
+        possessive = f"{self.name}'" if self.name.endswith("s") else f"{self.name}'s"
+        return f"{self.emoji} {possessive} {self.theme} Analysis"
+
+    @property
+    def insight_title(self) -> str:
+        return f"{self.emoji} {self.theme} Perspective ({self.name})"
+
+
+def load_advisors(path: str) -> Dict[str, Advisor]:
+    """Advisors from the ``[advisors.<key>]`` tables of a TOML file, in file order"""
+    with open(path, "rb") as handle:
+        tables = tomllib.load(handle).get("advisors")
+    if not isinstance(tables, dict) or not tables:
+        raise ValueError("no [advisors.<key>] tables")
+    return {key: Advisor(key=key, **fields) for key, fields in tables.items()}
+
+
+class AdvisorRegistry(Mapping[str, Advisor]):
+    def __init__(
+        self,
+        path: str,
+        check_interval: float = env_float("GAIA_ADVISORS_CHECK_INTERVAL", 2.0)
+    ):
+        self.path = path
+        self.check_interval = check_interval
+        # Bumped on every (re)load, so dependants can tell when to resync
+        self.version = 0
+        self.error: Optional[str] = None
+        self._advisors: Optional[Dict[str, Advisor]] = None
+        self._mtime: Optional[int] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload the file if it changed; returns whether the panel changed"""
+        now = time.monotonic()
+        if not force and self._advisors is not None and now - self._checked < self.check_interval:
+            return False
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                if self._advisors is None:
+                    raise
+                self.error = f"{self.path}: {e}"
+                return False
+            if mtime == self._mtime:
+                return False
+            try:
+                loaded = load_advisors(self.path)
+            except (OSError, ValueError, ValidationError, tomllib.TOMLDecodeError) as e:
+                if self._advisors is None:
+                    raise
+                # Keep serving the last good panel until the file changes again
+                self.error = f"{self.path}: {e}"
+                self._mtime = mtime
+                return False
+            self._advisors = loaded
+            self._mtime = mtime
+            self.error = None
+            self.version += 1
+            return True
+
+    def _current(self) -> Dict[str, Advisor]:
+        self.refresh()
+        return self._advisors
+
+    def __getitem__(self, key: str) -> Advisor:
+        return self._current()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._current()))
+
+    def __len__(self) -> int:
+        return len(self._current())
+
+    def view(self, attribute: str) -> Mapping[str, Any]:
+        """Live mapping of advisor key to one attribute, e.g. ``"section_title"``"""
+        return RegistryView(self, attribute)
+
+
+class RegistryView(Mapping[str, Any]):
+    def __init__(self, registry: AdvisorRegistry, attribute: str):
+        self.registry = registry
+        self.attribute = attribute
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self.registry[key], self.attribute)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.registry)
+
+    def __len__(self) -> int:
+        return len(self.registry)
+
+
+advisors = AdvisorRegistry(env_str("GAIA_ADVISORS_FILE", DEFAULT_FILE))
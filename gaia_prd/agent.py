@@ -0,0 +1,593 @@
+"""Gaia advisor agents talking to OpenAI-compatible chat-completion nodes."""
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import httpx
+
+from .advisors import Advisor, AdvisorRegistry, advisors
+from .breaker import breakers, call_with_retry, describe_error
+from .budget import Budget, budgets
+from .cache import cache_key, response_cache
+from .client import get_client
+from .config import env_float, env_list
+from .health import health
+from .limits import AgentLimits, scheduler
+from .metrics import AttemptTrace, current_call, registry
+from .models import AgentResponse, CallMetrics, Reuse
+from .policy import hedged_call, latency
+from .semantic import semantic_cache
+from .singleflight import inflight
+
+SOFT_DEADLINE = env_float("GAIA_SOFT_DEADLINE", 20.0)
+HARD_DEADLINE = env_float("GAIA_HARD_DEADLINE", 60.0)
+
+
+class GaiaAgent:
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        perspective: str,
+        model: str = "gpt-3.5-turbo",
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        fallback_urls: Optional[List[str]] = None,
+        soft_deadline: float = SOFT_DEADLINE,
+        hard_deadline: float = HARD_DEADLINE,
+        limits: Optional[AgentLimits] = None
+    ):
+        self.name = name
+        self.url = url
+        self.perspective = perspective
+        self.model = model
+        self.temperature = temperature
+        # This advisor's cap on completion length; budgets are cut to fit it (see budget())
+        self.max_tokens = max_tokens
+        self.fallback_urls = list(fallback_urls or [])
+        # After the soft deadline a hedged request goes to the next endpoint;
+        # after the hard deadline the analysis is given up on
+        self.soft_deadline = soft_deadline
+        self.hard_deadline = hard_deadline
+        # Optional concurrency / rate caps on upstream calls (e.g. for batch runs)
+        self.limits = limits
+
+    @property
+    def configured_endpoints(self) -> List[str]:
+        return [self.url] + [url for url in self.fallback_urls if url != self.url]
+
+    @property
+    def endpoints(self) -> List[str]:
+        """Endpoints in the order they are tried: healthiest first"""
+        return health.rank(self.configured_endpoints)
+
+    def budget(self, mode: str = "full") -> Budget:
+        """Output budget of ``mode`` for this advisor, within its own ``max_tokens``"""
+        return budgets[mode].within(self.max_tokens)
+
+    def build_prompt(self, product_idea: str, budget: Budget = budgets["full"]) -> str:
+        return f"""You are {self.name} analyzing a product idea.
+
+Product Idea: "{product_idea}"
+
+Your expertise: {self.perspective}
+
+Provide analysis covering:
+1. Key opportunities and challenges
+2. Strategic recommendations
+3. Important considerations
+4. Success factors
+
+Keep response focused and actionable ({budget.words}). Think from your unique perspective.
+
+Respond in plain text, not JSON."""
+
+    def build_refine_prompt(
+        self,
+        product_idea: str,
+        own: str,
+        peers: Dict[str, str],
+        budget: Budget = budgets["full"]
+    ) -> str:
+        """Round-two prompt: ``own`` and ``peers`` (name to text) are summaries
+        of the first-round analyses"""
+        panel = "\n".join(f"- {name}: {text}" for name, text in peers.items())
+        return f"""You are {self.name} refining your analysis of a product idea after hearing the rest of the advisory panel.
+
+Product Idea: "{product_idea}"
+
+Your expertise: {self.perspective}
+
+Your first analysis, summarized:
+{own}
+
+What the other advisors said, summarized:
+{panel}
+
+Revise your analysis: keep what still holds, respond to the strongest points you agree or disagree with, and sharpen your recommendations.
+
+Keep response focused and actionable ({budget.words}). Think from your unique perspective.
+
+Respond in plain text, not JSON."""
+
+    def build_payload(self, prompt: str, stream: bool = False, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "max_tokens": self.output_tokens(max_tokens or budgets["full"].max_tokens),
+            "stream": stream
+        }
+
+    def output_tokens(self, wanted: int) -> int:
+        """``max_tokens`` for a completion budgeted at ``wanted`` tokens"""
+        return min(wanted, self.max_tokens) if self.max_tokens else wanted
+
+    def cache_key(self, prompt: str, max_tokens: int) -> str:
+        return cache_key(self.name, self.url, self.model, self.temperature, self.output_tokens(max_tokens), prompt)
+
+    @staticmethod
+    def parse_completion(response_text: str) -> str:
+        return GaiaAgent.parse_body(response_text)[0]
+
+    @staticmethod
+    def parse_body(response_text: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Completion text and token ``usage`` (if reported) from a response body"""
+        # Handle both JSON and plain text responses
+        try:
+            data = json.loads(response_text)
+            if isinstance(data, dict) and data.get('choices'):
+                return data['choices'][0]['message']['content'], data.get('usage')
+            else:
+                return response_text, None
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return response_text, None
+
+    async def analyze(
+        self,
+        product_idea: str,
+        on_update: Optional[Callable[[str], None]] = None,
+        use_cache: bool = True,
+        similarity: Optional[float] = None,
+        mode: str = "full"
+    ) -> AgentResponse:
+        """Analyze a product idea; with ``on_update`` the completion is streamed
+        and the callback receives the accumulated text after every chunk.
+
+        ``use_cache=False`` skips the cache lookup but still refreshes the entry.
+        With a ``similarity`` threshold the cached analysis of an earlier idea
+        at least that similar is reused (see :mod:`gaia_prd.semantic`).
+        ``mode`` picks the output budget (see :mod:`gaia_prd.budget`).
+        Failures are returned as an ``AgentResponse`` with ``error`` set rather
+        than raised.
+        """
+        started_at, started = time.time(), time.perf_counter()
+        budget = self.budget(mode)
+        prompt = self.build_prompt(product_idea, budget)
+        key = self.cache_key(prompt, budget.max_tokens)
+        if use_cache:
+            cached = self._cached(key, on_update, started_at, started)
+            if cached is not None:
+                return cached
+            if similarity is not None:
+                reused = self._reuse_similar(product_idea, similarity, budget, on_update, started_at, started)
+                if reused is not None:
+                    return reused
+
+        result, led = await self._complete(prompt, key, budget.max_tokens, on_update, started_at, started)
+        if led and result.ok:
+            semantic_cache.add(self.semantic_namespace(budget), product_idea, key)
+        return result
+
+    async def complete(
+        self,
+        prompt: str,
+        on_update: Optional[Callable[[str], None]] = None,
+        use_cache: bool = True,
+        max_tokens: int = budgets["full"].max_tokens
+    ) -> AgentResponse:
+        """Like :meth:`analyze`, for a prompt built by the caller"""
+        started_at, started = time.time(), time.perf_counter()
+        key = self.cache_key(prompt, max_tokens)
+        if use_cache:
+            cached = self._cached(key, on_update, started_at, started)
+            if cached is not None:
+                return cached
+        result, _ = await self._complete(prompt, key, max_tokens, on_update, started_at, started)
+        return result
+
+    def _cached(
+        self,
+        key: str,
+        on_update: Optional[Callable[[str], None]],
+        started_at: float,
+        started: float
+    ) -> Optional[AgentResponse]:
+        cached = response_cache.get(key)
+        if cached is None:
+            return None
+        if on_update is not None:
+            on_update(cached)
+        metrics = CallMetrics(
+            agent=self.name,
+            started_at=started_at,
+            total_ms=(time.perf_counter() - started) * 1000,
+            cache_hit=True
+        )
+        registry.record(metrics)
+        return AgentResponse(analysis=cached, cached=True, metrics=metrics)
+
+    async def _complete(
+        self,
+        prompt: str,
+        key: str,
+        max_tokens: int,
+        on_update: Optional[Callable[[str], None]],
+        started_at: float,
+        started: float
+    ) -> Tuple[AgentResponse, bool]:
+        """Fetch ``prompt`` upstream; also returns whether this caller led the call"""
+        last_seen = None
+        led = False
+
+        def update(text: str) -> None:
+            nonlocal last_seen
+            last_seen = text
+            on_update(text)
+
+        def fetch(publish: Callable[[str], None]) -> Awaitable[AgentResponse]:
+            nonlocal led
+            led = True
+            payload = self.build_payload(prompt, max_tokens=max_tokens)
+            return self._fetch(payload, key, publish if on_update is not None else None)
+
+        # Concurrent identical requests (e.g. several sessions clicking the same
+        # example) share one upstream call
+        result = await inflight.do(key, fetch, update if on_update is not None else None)
+        # Waiters that joined a non-streaming call still get the final text
+        if on_update is not None and result.analysis and result.analysis != last_seen:
+            on_update(result.analysis)
+
+        if not led and result.metrics is not None:
+            # Report the shared call from this caller's point of view
+            result = result.model_copy(update={"metrics": result.metrics.model_copy(update={
+                "started_at": started_at,
+                "total_ms": (time.perf_counter() - started) * 1000,
+                "coalesced": True
+            })})
+        if result.metrics is not None:
+            registry.record(result.metrics)
+        return result, led
+
+    def semantic_namespace(self, budget: Budget = budgets["full"]) -> str:
+        """Everything but the product idea that determines an analysis"""
+        return cache_key(self.name, self.url, self.model, self.temperature, self.output_tokens(budget.max_tokens), budget.words)
+
+    def _reuse_similar(
+        self,
+        product_idea: str,
+        similarity: float,
+        budget: Budget,
+        on_update: Optional[Callable[[str], None]],
+        started_at: float,
+        started: float
+    ) -> Optional[AgentResponse]:
+        for match in semantic_cache.search(self.semantic_namespace(budget), product_idea, similarity):
+            # peek: the exact lookup already counted this call's miss
+            cached = response_cache.peek(match.key)
+            if cached is None:
+                continue  # expired or evicted from the response cache
+            semantic_cache.record_hit()
+            if on_update is not None:
+                on_update(cached)
+            metrics = CallMetrics(
+                agent=self.name,
+                started_at=started_at,
+                total_ms=(time.perf_counter() - started) * 1000,
+                cache_hit=True,
+                similarity=match.similarity
+            )
+            registry.record(metrics)
+            return AgentResponse(
+                analysis=cached,
+                cached=True,
+                reused_from=Reuse(idea=match.idea, similarity=match.similarity),
+                metrics=metrics
+            )
+        return None
+
+    async def _fetch(
+        self,
+        payload: Dict[str, Any],
+        key: str,
+        on_update: Optional[Callable[[str], None]] = None
+    ) -> AgentResponse:
+        streaming = on_update is not None
+        call = CallMetrics(agent=self.name, started_at=time.time())
+        started = time.perf_counter()
+        # Attempts (hedges, failovers, retries) report into this call's metrics
+        token = current_call.set(call)
+        # Endpoints of the attempts waiting on their node, by attempt
+        attempts: Dict[object, str] = {}
+        try:
+            text = await asyncio.wait_for(
+                hedged_call(
+                    lambda endpoint, publish: self._attempt(endpoint, payload, publish, attempts),
+                    self.endpoints,
+                    lambda endpoint: self.hedge_delay(endpoint, streaming),
+                    on_update
+                ),
+                timeout=self.hard_deadline
+            )
+        except asyncio.TimeoutError:
+            call.error = f"no response within {self.hard_deadline:g}s"
+            self._abandon(attempts)
+        except Exception as e:
+            call.error = describe_error(e)
+            if isinstance(e, httpx.HTTPStatusError):
+                call.status = e.response.status_code
+        finally:
+            current_call.reset(token)
+            call.total_ms = (time.perf_counter() - started) * 1000
+
+        if call.error is not None:
+            return AgentResponse(analysis="", error=call.error, metrics=call)
+        response_cache.set(key, text)
+        return AgentResponse(analysis=text, metrics=call)
+
+    @staticmethod
+    def _abandon(attempts: Dict[object, str]) -> None:
+        """Count attempts still waiting on their node at the hard deadline as
+        failures of its breaker. Cancelling an attempt only ends it, so a node
+        that accepts connections and never answers would never open its
+        breaker. (Hedges that lose a race are not counted: they are usually
+        just the slow tail of a healthy node.)"""
+        for endpoint in attempts.values():
+            breakers.get(endpoint).record_failure()
+
+    def hedge_delay(self, endpoint: str, streaming: bool = False) -> float:
+        """Seconds to wait on ``endpoint`` before racing the next one: its p95
+        latency once known, capped by the soft deadline"""
+        p95 = latency.quantile(self._latency_key(endpoint, streaming), 0.95)
+        return min(p95, self.soft_deadline) if p95 is not None else self.soft_deadline
+
+    @staticmethod
+    def _latency_key(endpoint: str, streaming: bool) -> str:
+        # Streams are judged on time to first token, plain calls on the full response
+        return f"{endpoint} (stream)" if streaming else endpoint
+
+    async def _attempt(
+        self,
+        endpoint: str,
+        payload: Dict[str, Any],
+        on_update: Optional[Callable[[str], None]] = None,
+        attempts: Optional[Dict[object, str]] = None
+    ) -> str:
+        call = current_call.get()
+        if call is not None:
+            call.attempts += 1
+        async with scheduler.slot(endpoint):
+            if self.limits is None:
+                return await self._tracked(endpoint, payload, on_update, attempts)
+            async with self.limits.slot():
+                return await self._tracked(endpoint, payload, on_update, attempts)
+
+    async def _tracked(
+        self,
+        endpoint: str,
+        payload: Dict[str, Any],
+        on_update: Optional[Callable[[str], None]] = None,
+        attempts: Optional[Dict[object, str]] = None
+    ) -> str:
+        """:meth:`_request`, listed in ``attempts`` until it settles; one still
+        listed was cancelled while waiting on the node (see :meth:`_abandon`)"""
+        if attempts is None:
+            return await self._request(endpoint, payload, on_update)
+        # Attempts on one endpoint can overlap (hedges of concurrent calls, retries)
+        attempt = object()
+        attempts[attempt] = endpoint
+        try:
+            text = await self._request(endpoint, payload, on_update)
+        except Exception:
+            del attempts[attempt]
+            raise
+        del attempts[attempt]
+        return text
+
+    async def _request(
+        self,
+        endpoint: str,
+        payload: Dict[str, Any],
+        on_update: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """One request against one endpoint (retried on 429/5xx behind its
+        circuit breaker); raises unless it yields an analysis"""
+        client = get_client()
+        call = current_call.get()
+        trace = AttemptTrace(endpoint)
+
+        def count_retry(attempt: int, error: BaseException) -> None:
+            if call is not None:
+                call.retries += 1
+
+        if on_update is None:
+            async def post() -> httpx.Response:
+                nonlocal trace
+                trace = AttemptTrace(endpoint)
+                response = await client.post(
+                    endpoint,
+                    json=payload,
+                    extensions={"trace": trace}
+                )
+                trace.status = response.status_code
+                response.raise_for_status()
+                return response
+
+            response = await call_with_retry(endpoint, post, on_retry=count_retry)
+            text, trace.usage = self.parse_body(response.text)
+            trace.response_bytes = response.num_bytes_downloaded
+            latency.record(endpoint, trace.elapsed_ms() / 1000)
+        else:
+            first_token = True
+
+            def update(text: str) -> None:
+                nonlocal first_token
+                if first_token:
+                    trace.first_token_ms = trace.elapsed_ms()
+                    latency.record(self._latency_key(endpoint, True), trace.first_token_ms / 1000)
+                    first_token = False
+                on_update(text)
+
+            async def stream() -> str:
+                nonlocal trace
+                trace = AttemptTrace(endpoint)
+                return await self._stream(client, endpoint, payload, update, trace)
+
+            # Once tokens have been shown, a retry would restart the text; fail over instead
+            text = await call_with_retry(
+                endpoint,
+                stream,
+                on_retry=count_retry,
+                can_retry=lambda: first_token
+            )
+
+        if not text.strip():
+            raise ValueError(f"empty completion from {endpoint}")
+        if call is not None:
+            trace.apply(call)
+        return text
+
+    async def _stream(
+        self,
+        client: httpx.AsyncClient,
+        endpoint: str,
+        payload: Dict[str, Any],
+        on_update: Callable[[str], None],
+        trace: AttemptTrace
+    ) -> str:
+        async with client.stream(
+            "POST",
+            endpoint,
+            json={**payload, "stream": True},
+            extensions={"trace": trace}
+        ) as response:
+            trace.status = response.status_code
+            if not response.is_success:
+                await response.aread()
+                response.raise_for_status()
+
+            # Some nodes ignore "stream" and answer with a single JSON or plain text body
+            if "text/event-stream" not in response.headers.get("content-type", ""):
+                body = (await response.aread()).decode(response.encoding or "utf-8", "replace")
+                text, trace.usage = self.parse_body(body)
+                trace.response_bytes = response.num_bytes_downloaded
+                if text.strip():
+                    on_update(text)
+                return text
+
+            text = ""
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                chunk = line[5:].strip()
+                if chunk == "[DONE]":
+                    break
+                try:
+                    data = json.loads(chunk)
+                    # Servers that report usage send it on the last chunk
+                    if isinstance(data, dict) and data.get("usage"):
+                        trace.usage = data["usage"]
+                    choice = data["choices"][0]
+                except (json.JSONDecodeError, KeyError, IndexError, TypeError):
+                    continue
+                delta = (choice.get("delta") or choice.get("message") or {}).get("content")
+                if delta:
+                    text += delta
+                    on_update(text)
+            trace.response_bytes = response.num_bytes_downloaded
+            return text
+
+
+class AgentRegistry(Mapping[str, GaiaAgent]):
+    """A :class:`GaiaAgent` per advisor, kept in step with the advisor registry.
+
+    When an advisor's entry changes its agent is updated in place, so agents
+    held elsewhere (and their in-flight calls) stay valid. Settings given to
+    :meth:`override` (e.g. by the batch CLI or the benchmarks) win over the
+    registry file and survive its reloads.
+    """
+
+    def __init__(self, registry: AdvisorRegistry):
+        self.registry = registry
+        self._agents: Dict[str, GaiaAgent] = {}
+        self._sources: Dict[str, Advisor] = {}
+        self._overrides: Dict[Optional[str], Dict[str, Any]] = {}
+        self._version = -1
+        self._lock = threading.Lock()
+
+    def override(self, key: Optional[str] = None, **fields: Any) -> None:
+        """Pin :class:`Advisor` fields of one advisor (or of all with no key)"""
+        unknown = set(fields) - set(Advisor.model_fields)
+        if unknown:
+            raise ValueError(f"unknown advisor fields: {', '.join(sorted(unknown))}")
+        with self._lock:
+            self._overrides.setdefault(key, {}).update(fields)
+            self._version = -1
+
+    def _pinned(self, key: str) -> Dict[str, Any]:
+        return {**self._overrides.get(None, {}), **self._overrides.get(key, {})}
+
+    def _current(self) -> Dict[str, GaiaAgent]:
+        self.registry.refresh()
+        if self._version == self.registry.version:
+            return self._agents
+        with self._lock:
+            version = self.registry.version
+            current, sources = {}, {}
+            for key, advisor in self.registry.items():
+                pinned = self._pinned(key)
+                if pinned:
+                    advisor = advisor.model_copy(update=pinned)
+                agent = self._agents.get(key)
+                if agent is None:
+                    agent = GaiaAgent(advisor.name, advisor.url, advisor.perspective)
+                if agent is not self._agents.get(key) or self._sources.get(key) != advisor:
+                    self.configure(agent, advisor, env_fallbacks="fallback_urls" not in pinned)
+                current[key], sources[key] = agent, advisor
+            self._agents, self._sources, self._version = current, sources, version
+        return self._agents
+
+    @staticmethod
+    def configure(agent: GaiaAgent, advisor: Advisor, env_fallbacks: bool = True) -> None:
+        agent.name = advisor.name
+        agent.url = advisor.url
+        agent.perspective = advisor.perspective
+        agent.model = advisor.model
+        agent.temperature = advisor.temperature
+        agent.max_tokens = advisor.max_tokens
+        agent.soft_deadline = advisor.soft_deadline or SOFT_DEADLINE
+        agent.hard_deadline = advisor.hard_deadline or HARD_DEADLINE
+        limits = (advisor.concurrency, advisor.rate)
+        if limits == (None, None):
+            agent.limits = None
+        elif agent.limits is None or (agent.limits.concurrency, agent.limits.rate) != limits:
+            # Only when they change: calls in flight hold slots of the old limits
+            agent.limits = AgentLimits(*limits)
+        agent.fallback_urls = list(advisor.fallback_urls)
+        if env_fallbacks:
+            agent.fallback_urls += env_list(f"GAIA_{advisor.key.upper()}_FALLBACK_URLS")
+
+    def __getitem__(self, key: str) -> GaiaAgent:
+        return self._current()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._current()))
+
+    def __len__(self) -> int:
+        return len(self._current())
+
+
+# ===== AGENT DEFINITIONS =====
+agents = AgentRegistry(advisors)
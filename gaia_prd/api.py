@@ -0,0 +1,396 @@
+"""Async HTTP API exposing ``generate_prd`` as a submit / poll / stream job API.
+
+    uvicorn gaia_prd.api:app        # or: python -m gaia_prd serve
+
+``POST /jobs`` enqueues a PRD and returns ``202`` with the job id (or ``429``
+when the queue is full), ``GET /jobs/{id}`` polls it and
+``GET /jobs/{id}/events`` streams partial advisor output as server-sent
+events until the PRD is ready. ``GET /jobs/{id}/documents/{name}`` streams
+a finished PRD, dev prompt or build prompt as Markdown, HTML or JSON.
+``GET /history`` searches stored PRDs and ``GET /history/export`` streams
+them as NDJSON. ``GET /metrics`` exports advisor call metrics for Prometheus. A fixed pool of
+worker tasks drains a bounded in-process queue, so throughput scales with
+``GAIA_API_WORKERS``.
+"""
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from .agent import agents
+from .budget import MODES, TOKENIZER_TIMEOUT, load_tokenizer
+from .client import aclose_client
+from .config import env_int
+from .health import health
+from .history import HistoryEntry, HistoryStore, history
+from .limits import scheduler
+from .metrics import registry
+from .models import PRDRequest, PRDResponse
+from .prd import DOCUMENTS, generate_prd, prd_context
+from .render import FORMATS, MEDIA_TYPES, stream
+from .semantic import semantic_cache
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobRequest(PRDRequest):
+    agents: Optional[List[str]] = None
+    use_cache: bool = True
+    deadline: Optional[float] = None
+    format: str = "markdown"
+    session_id: Optional[str] = None
+    # Reuse analyses of earlier ideas at least this similar (null: off)
+    similarity: Optional[float] = Field(default_factory=lambda: semantic_cache.default_threshold)
+    # Two debate rounds plus a synthesis agent (see gaia_prd.debate)
+    debate: bool = False
+    # Output budget: "full" or "brief" (see gaia_prd.budget)
+    mode: str = "full"
+
+
+class JobStatus(BaseModel):
+    id: str
+    status: str
+    position: Optional[int] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    partial: Dict[str, str] = {}
+    result: Optional[PRDResponse] = None
+    error: Optional[str] = None
+    # Set when the PRD is done but could not be saved to the PRD history
+    history_error: Optional[str] = None
+
+
+class Job:
+    def __init__(self, request: JobRequest, session: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.session = session
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.partial: Dict[str, str] = {}
+        self.result: Optional[PRDResponse] = None
+        self.error: Optional[str] = None
+        self.history_error: Optional[str] = None
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    def result_request(self) -> PRDRequest:
+        """The plain ``PRDRequest`` part of the job request"""
+        return PRDRequest(**self.request.model_dump(include=set(PRDRequest.model_fields)))
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def touch(self) -> None:
+        """Wake everyone waiting for this job to change"""
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_changed(self, seen: int) -> None:
+        while self.version == seen:
+            await self._changed.wait()
+
+    def to_status(self, position: Optional[int] = None, include_partial: bool = True) -> JobStatus:
+        return JobStatus(
+            id=self.id,
+            status=self.status,
+            position=position,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            partial=self.partial if include_partial and not self.finished else {},
+            result=self.result,
+            error=self.error,
+            history_error=self.history_error,
+        )
+
+
+class JobQueue:
+    """Bounded queue of PRD jobs drained by a fixed pool of worker tasks"""
+
+    def __init__(self, workers: int = 4, max_queued: int = 64, max_jobs: int = 1000):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.queue: "asyncio.Queue[Job]" = asyncio.Queue(maxsize=max_queued)
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+        self._service_time = 0.0
+        self._completed = 0
+
+    def start(self) -> None:
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, request: JobRequest, session: Optional[str] = None) -> Job:
+        """Enqueue a job; raises ``asyncio.QueueFull`` when at capacity"""
+        job = Job(request, session)
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+        self._evict()
+        return job
+
+    def position(self, job: Job) -> Optional[int]:
+        if job.status != QUEUED:
+            return None
+        queued = [other for other in self.jobs.values() if other.status == QUEUED]
+        return queued.index(job) + 1 if job in queued else None
+
+    def retry_after(self) -> int:
+        """Rough seconds until a queue slot frees up"""
+        average = self._service_time / self._completed if self._completed else 30.0
+        return max(1, int(average * self.queue.qsize() / max(1, self.workers)))
+
+    def _evict(self) -> None:
+        # Forget the oldest finished jobs once we keep too many
+        if len(self.jobs) <= self.max_jobs:
+            return
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished]:
+            del self.jobs[job_id]
+            if len(self.jobs) <= self.max_jobs:
+                break
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.touch()
+
+        def on_update(agent_key: str, text: str) -> None:
+            job.partial[agent_key] = text
+            job.touch()
+
+        request = job.request
+        # Without an explicit panel, skip advisors whose nodes are all down
+        keys = request.agents or health.available(agents)
+        selected = {key: key in keys for key in agents}
+        try:
+            job.result = await generate_prd(
+                job.result_request(),
+                selected,
+                on_update=on_update,
+                use_cache=request.use_cache,
+                deadline=request.deadline,
+                format=request.format,
+                session_id=job.session,
+                similarity=request.similarity,
+                debate=request.debate,
+                mode=request.mode,
+            )
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        else:
+            # Saved before the job reports done, so /history finds it right after;
+            # the PRD itself is fine either way, so a failed write does not fail the job
+            if history is not None:
+                try:
+                    await asyncio.to_thread(
+                        history.record,
+                        job.result_request(),
+                        job.result,
+                        time.time() - job.started_at,
+                        job.session,
+                        request.deadline,
+                        request.format,
+                    )
+                except Exception as e:
+                    job.history_error = str(e)
+            job.status = DONE
+        job.finished_at = time.time()
+        self._service_time += job.finished_at - job.started_at
+        self._completed += 1
+        job.touch()
+
+
+jobs = JobQueue(
+    workers=env_int("GAIA_API_WORKERS", 4),
+    max_queued=env_int("GAIA_API_QUEUE_SIZE", 64),
+    max_jobs=env_int("GAIA_API_MAX_JOBS", 1000),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    jobs.start()
+    health.start()
+    # Exact token counts from the first PRD, if the vocabulary loads in time
+    await asyncio.to_thread(load_tokenizer, TOKENIZER_TIMEOUT)
+    try:
+        yield
+    finally:
+        health.stop()
+        await jobs.stop()
+        await aclose_client()
+
+
+app = FastAPI(title="Gaia PRD Generator", lifespan=lifespan)
+
+
+def _get_job(job_id: str) -> Job:
+    job = jobs.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown job")
+    return job
+
+
+@app.post("/jobs", status_code=202, response_model=JobStatus)
+async def submit_job(request: JobRequest, http_request: Request):
+    unknown = [key for key in request.agents or [] if key not in agents]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"unknown advisors: {', '.join(unknown)}")
+    if request.format not in FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(FORMATS)}")
+    if request.mode not in MODES:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {', '.join(MODES)}")
+    try:
+        # Upstream calls are shared fairly between clients
+        session = request.session_id or (http_request.client.host if http_request.client else None)
+        job = jobs.submit(request, session)
+    except asyncio.QueueFull:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "PRD queue is full, try again later"},
+            headers={"Retry-After": str(jobs.retry_after())},
+        )
+    return JSONResponse(
+        status_code=202,
+        content=job.to_status(jobs.position(job)).model_dump(mode="json"),
+        headers={"Location": f"/jobs/{job.id}"},
+    )
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    job = _get_job(job_id)
+    return job.to_status(jobs.position(job))
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = _get_job(job_id)
+
+    async def events() -> AsyncIterator[str]:
+        sent: Dict[str, str] = {}
+        seen = -1
+        status = None
+        while True:
+            await job.wait_changed(seen)
+            seen = job.version
+            if job.status != status:
+                status = job.status
+                yield _sse("status", {"status": status})
+            # Send only what is new for each advisor; a restarted stream (failover) resets it
+            for agent_key, text in list(job.partial.items()):
+                previous = sent.get(agent_key, "")
+                if text == previous:
+                    continue
+                if text.startswith(previous):
+                    yield _sse("partial", {"agent": agent_key, "delta": text[len(previous):]})
+                else:
+                    yield _sse("partial", {"agent": agent_key, "text": text, "reset": True})
+                sent[agent_key] = text
+            if job.finished:
+                yield _sse("result", job.to_status(include_partial=False).model_dump(mode="json"))
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/jobs/{job_id}/documents/{document}")
+async def job_document(job_id: str, document: str, format: str = "markdown"):
+    """Stream one rendered document of a finished job, section by section"""
+    job = _get_job(job_id)
+    if document not in DOCUMENTS:
+        raise HTTPException(status_code=404, detail=f"unknown document, expected one of {', '.join(DOCUMENTS)}")
+    if format not in FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(FORMATS)}")
+    if job.result is None:
+        raise HTTPException(status_code=409, detail=f"job is {job.status}")
+    context = prd_context(job.result_request(), job.result, job.request.deadline)
+    return StreamingResponse(stream(DOCUMENTS[document], context, format), media_type=MEDIA_TYPES[format])
+
+
+def _history() -> HistoryStore:
+    if history is None:
+        raise HTTPException(status_code=404, detail="PRD history is disabled")
+    return history
+
+
+@app.get("/history", response_model=List[HistoryEntry])
+async def search_history(q: str = "", limit: int = 20, offset: int = 0):
+    return await asyncio.to_thread(_history().search, q, min(limit, 100), offset)
+
+
+@app.get("/history/export")
+async def export_history(q: str = "", since: Optional[float] = None):
+    """Every stored PRD as newline-delimited JSON, streamed page by page"""
+    store = _history()
+    records = store.export(q, since)
+
+    async def lines() -> AsyncIterator[str]:
+        while True:
+            # Pages are read off the event loop
+            batch = await asyncio.to_thread(lambda: [record for _, record in zip(range(100), records)])
+            for record in batch:
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+            if len(batch) < 100:
+                return
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/history/{response_id}")
+async def get_history(response_id: str):
+    stored = await asyncio.to_thread(_history().load, response_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="unknown PRD")
+    request, response, deadline = stored
+    return {"request": request, "response": response, "deadline": deadline}
+
+
+@app.get("/healthz")
+async def healthz():
+    return {
+        "status": "ok",
+        "queued": jobs.queue.qsize(),
+        "capacity": jobs.queue.maxsize,
+        "workers": jobs.workers,
+        "endpoints": scheduler.stats(),
+        "advisors": {key: status.model_dump() for key, status in health.snapshot().items()},
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
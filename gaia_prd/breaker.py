@@ -0,0 +1,208 @@
+"""Per-endpoint circuit breakers and jittered exponential retry.
+
+A breaker tracks the outcomes of recent calls to one endpoint. Once the
+failure rate inside the window crosses the threshold it opens and every call
+fails immediately with :class:`CircuitOpenError`. After the cooldown a single
+probe is let through (half-open): success closes the breaker, failure opens it
+again.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+import httpx
+
+from .config import env_float, env_int
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"circuit open for {endpoint}, retrying in {retry_in:.0f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        endpoint: str,
+        window: float = env_float("GAIA_BREAKER_WINDOW", 60.0),
+        min_calls: int = env_int("GAIA_BREAKER_MIN_CALLS", 5),
+        failure_rate: float = env_float("GAIA_BREAKER_FAILURE_RATE", 0.5),
+        cooldown: float = env_float("GAIA_BREAKER_COOLDOWN", 30.0),
+    ):
+        self.endpoint = endpoint
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._probing = False
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+
+    def allow(self) -> bool:
+        """Raise :class:`CircuitOpenError` if a call may not go out now;
+        True if this call took the half-open probe slot"""
+        if self.state == CLOSED:
+            return False
+        now = time.monotonic()
+        if self.state == OPEN:
+            retry_in = self.opened_at + self.cooldown - now
+            if retry_in > 0:
+                raise CircuitOpenError(self.endpoint, retry_in)
+            self.state = HALF_OPEN
+        # Half-open: only one probe at a time
+        if self._probing:
+            raise CircuitOpenError(self.endpoint, 0)
+        self._probing = True
+        return True
+
+    def is_open(self) -> bool:
+        """Whether calls are being refused right now (open and cooling down)"""
+        return self.state == OPEN and time.monotonic() < self.opened_at + self.cooldown
+
+    def record_success(self, probe: bool = False) -> None:
+        """Record a successful call; ``probe`` as returned by :meth:`allow`"""
+        self._record(True)
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self._outcomes.clear()
+        if probe:
+            self._probing = False
+
+    def record_failure(self, probe: bool = False) -> None:
+        self._record(False)
+        if self.state == HALF_OPEN or self._tripped():
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+        if probe:
+            self._probing = False
+
+    def release(self, probe: bool = False) -> None:
+        """End a call without recording an outcome, giving back the half-open
+        probe slot if it held it"""
+        if probe:
+            self._probing = False
+
+    def _record(self, ok: bool) -> None:
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def _tripped(self) -> bool:
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return False
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return failures / calls >= self.failure_rate
+
+
+class BreakerRegistry:
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # Breakers are added on the event loop and listed from other threads
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(endpoint, CircuitBreaker(endpoint))
+        return breaker
+
+    def is_open(self, endpoint: str) -> bool:
+        breaker = self._breakers.get(endpoint)
+        return breaker is not None and breaker.is_open()
+
+    def states(self) -> Dict[str, str]:
+        """State of every endpoint's breaker (safe to call from other threads)"""
+        with self._lock:
+            breakers = list(self._breakers.items())
+        return {endpoint: breaker.state for endpoint, breaker in breakers}
+
+
+breakers = BreakerRegistry()
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TransportError, httpx.TimeoutException))
+
+
+def describe_error(error: BaseException) -> str:
+    """Short, user-facing description of why a call failed"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"HTTP {error.response.status_code} from {error.request.url.host}"
+    if isinstance(error, httpx.TimeoutException):
+        return "request timed out"
+    if isinstance(error, httpx.TransportError):
+        return f"connection failed ({type(error).__name__})"
+    return str(error) or type(error).__name__
+
+
+def backoff_delay(attempt: int, base: float, cap: float, error: Optional[BaseException] = None) -> float:
+    """Full-jitter exponential backoff, honouring ``Retry-After`` when given"""
+    if isinstance(error, httpx.HTTPStatusError):
+        retry_after = error.response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(cap, float(retry_after))
+            except ValueError:
+                pass
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def call_with_retry(
+    endpoint: str,
+    fn: Callable[[], Awaitable[T]],
+    retries: int = env_int("GAIA_RETRIES", 2),
+    base: float = 0.5,
+    cap: float = 8.0,
+    on_retry: Optional[Callable[[int, BaseException], None]] = None,
+    can_retry: Callable[[], bool] = lambda: True,
+) -> T:
+    """Run ``fn`` through the endpoint's breaker, retrying 429/5xx and
+    transport errors with jittered exponential backoff.
+
+    ``can_retry`` lets the caller veto a retry, e.g. once a stream has
+    already delivered tokens.
+    """
+    breaker = breakers.get(endpoint)
+    attempt = 0
+    while True:
+        probe = breaker.allow()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            breaker.release(probe)
+            raise
+        except Exception as error:
+            retryable = is_retryable(error)
+            # A 429 means the node is alive but busy; do not count it against the breaker
+            if not (isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429):
+                breaker.record_failure(probe)
+            else:
+                breaker.release(probe)
+            if not retryable or attempt >= retries or not can_retry():
+                raise
+            if on_retry is not None:
+                on_retry(attempt + 1, error)
+            await asyncio.sleep(backoff_delay(attempt, base, cap, error))
+            attempt += 1
+            continue
+        breaker.record_success(probe)
+        return result
@@ -0,0 +1,132 @@
+"""Token budgets for advisor prompts and outputs.
+
+Each output mode asks the advisors for a word range and caps the completion
+at ``max_tokens`` derived from it, so upstream generation time (which grows
+with tokens) is bounded up front rather than thrown away afterwards; an
+advisor with its own ``max_tokens`` is asked for proportionally fewer words.
+Tokens are counted with ``tiktoken`` once its vocabulary has loaded (on a
+worker thread, see :func:`load_tokenizer`) and estimated from words and
+characters until then or without it.
+"""
+import math
+import threading
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+from .config import env_float
+from .summary import clip, summarize
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to the estimate below
+    tiktoken = None
+
+# Typical for English prose with some Markdown under GPT-style BPE vocabularies
+TOKENS_PER_WORD = 1.35
+# Room above the requested length before a completion is cut off
+HEADROOM = env_float("GAIA_OUTPUT_HEADROOM", 1.3)
+# Seconds servers wait at startup for the tokenizer vocabulary
+TOKENIZER_TIMEOUT = env_float("GAIA_TOKENIZER_TIMEOUT", 5.0)
+
+_encoding = None
+_loader: Optional[threading.Thread] = None
+_loader_lock = threading.Lock()
+
+
+def _load_encoding() -> None:
+    global _encoding
+    try:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Offline without a cached vocabulary: keep estimating
+        pass
+
+
+def load_tokenizer(timeout: float = 0.0) -> bool:
+    """Start loading the tiktoken vocabulary on a worker thread (once) and
+    wait up to ``timeout`` seconds for it; True once it is loaded.
+
+    The first load downloads the vocabulary, or reads it from
+    ``TIKTOKEN_CACHE_DIR``, with no timeout of its own, so it never runs on
+    the caller's thread (or the shared event loop).
+    """
+    global _loader
+    if tiktoken is None:
+        return False
+    with _loader_lock:
+        if _loader is None:
+            _loader = threading.Thread(target=_load_encoding, name="gaia-tokenizer", daemon=True)
+            _loader.start()
+    if timeout > 0:
+        _loader.join(timeout)
+    return _encoding is not None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in ``text``: exact once the tiktoken vocabulary is loaded, otherwise an estimate"""
+    if load_tokenizer():
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(math.ceil(len(text.split()) * TOKENS_PER_WORD), math.ceil(len(text) / 4))
+
+
+def tokens_for_words(words: int) -> int:
+    return math.ceil(words * TOKENS_PER_WORD)
+
+
+class Budget(BaseModel):
+    name: str
+    # Length asked of each advisor, in words
+    min_words: int
+    max_words: int
+    # Length asked of the debate synthesis
+    synthesis_words: int
+    # Share of each analysis quoted in the development prompt
+    excerpt_tokens: int
+
+    @property
+    def words(self) -> str:
+        return f"{self.min_words}-{self.max_words} words"
+
+    @property
+    def max_tokens(self) -> int:
+        """Completion cap for an advisor analysis"""
+        return math.ceil(tokens_for_words(self.max_words) * HEADROOM)
+
+    @property
+    def synthesis_max_tokens(self) -> int:
+        return math.ceil(tokens_for_words(self.synthesis_words) * HEADROOM)
+
+    def within(self, max_tokens: Optional[int]) -> "Budget":
+        """This budget with the analysis length cut to fit ``max_tokens``, so
+        a capped advisor is asked for less rather than cut off mid-answer"""
+        if not max_tokens or max_tokens >= self.max_tokens:
+            return self
+        max_words = max(1, math.floor(max_tokens / HEADROOM / TOKENS_PER_WORD))
+        min_words = min(self.min_words, max(1, max_words * 3 // 4))
+        return self.model_copy(update={"min_words": min_words, "max_words": max_words})
+
+
+budgets: Dict[str, Budget] = {
+    budget.name: budget
+    for budget in [
+        Budget(name="full", min_words=300, max_words=400, synthesis_words=250, excerpt_tokens=160),
+        # Quick drafts: a fraction of the tokens, so a fraction of the wait
+        Budget(name="brief", min_words=80, max_words=120, synthesis_words=120, excerpt_tokens=80),
+    ]
+}
+MODES = tuple(budgets)
+
+
+def excerpt(text: str, max_tokens: int) -> str:
+    """``text`` cut to about ``max_tokens``: whole if it fits, otherwise its
+    key sentences rather than a prefix cut mid-word"""
+    if count_tokens(text) <= max_tokens:
+        return text.strip()
+    words = max(1, int(max_tokens / TOKENS_PER_WORD))
+    summary = summarize(text, words)
+    while count_tokens(summary) > max_tokens and words > 1:
+        # Dense text (numbers, code, long words) runs over the estimate
+        words = int(words * 0.8)
+        summary = clip(summary, words)
+    return summary
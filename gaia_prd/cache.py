@@ -0,0 +1,206 @@
+"""Content-addressed cache for advisor analyses.
+
+Entries are keyed on a hash of everything that determines a completion
+(agent, endpoint, model, sampling parameters and the full prompt). Lookups go
+to an in-memory LRU first and then to an optional SQLite file, so identical
+requests are answered without touching a Gaia node.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .config import env_float, env_int, env_str
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable SHA-256 key for the given request parts"""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """Thread-safe LRU with a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, stored_at: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (stored_at or time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """On-disk tier with TTL expiry and least-recently-used eviction by size"""
+
+    def __init__(self, path: str, ttl: float = 7 * 86400.0, max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return created_at, value
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until we are back under budget
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """Two-tier (memory, then optional disk) cache with hit/miss counters"""
+
+    def __init__(self, memory: MemoryCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        ttl = env_float("GAIA_CACHE_TTL", 86400.0)
+        memory = MemoryCache(max_entries=env_int("GAIA_CACHE_MAX_ENTRIES", 256), ttl=ttl)
+        disk = None
+        path = env_str("GAIA_CACHE_DB")
+        if path:
+            disk = SQLiteCache(path, ttl=ttl, max_bytes=env_int("GAIA_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+        return cls(memory, disk)
+
+    def get(self, key: str) -> Optional[str]:
+        value, from_disk = self._lookup(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.disk_hits += from_disk
+        return value
+
+    def peek(self, key: str) -> Optional[str]:
+        """Like :meth:`get`, without counting a hit or miss"""
+        return self._lookup(key)[0]
+
+    def _lookup(self, key: str) -> Tuple[Optional[str], bool]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                self.memory.set(key, value, stored_at)
+                return value, True
+        return value, False
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.memory),
+        }
+
+
+response_cache = ResponseCache.from_env()
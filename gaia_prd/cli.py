@@ -0,0 +1,261 @@
+"""Headless batch PRD generation.
+
+Reads ``PRDRequest`` objects from a JSONL file (one per line, optionally with
+an ``id`` and an ``agents`` list) and writes one ``PRDResponse`` JSON object
+per line as each PRD completes::
+
+    python -m gaia_prd batch ideas.jsonl -o prds.jsonl --concurrency 16 \\
+        --agent-concurrency 4 --agent-rate 2 --resume
+
+With ``--resume`` requests whose id already has a successful record in the
+output file are skipped, so an interrupted nightly run picks up where it
+stopped; a PRD that some advisor failed or never answered is run again. ``python -m gaia_prd serve`` runs the HTTP job API instead, and
+``python -m gaia_prd history`` searches or exports stored PRDs.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from .agent import agents
+from .budget import MODES
+from .client import aclose_client
+from .history import history
+from .models import PRDRequest
+from .prd import generate_prd
+from .render import FORMATS
+from .semantic import semantic_cache
+
+
+def request_id(record: Dict[str, Any], request: PRDRequest) -> str:
+    """Explicit ``id`` if present, else a hash of the request itself"""
+    if record.get("id") is not None:
+        return str(record["id"])
+    blob = json.dumps(request.model_dump(), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids that already have a successful record in an output file
+
+    A record with advisor errors or advisors still pending when the PRD was
+    written is a degraded PRD, so its id is left to be run again.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted run
+            if "error" in record or record.get("errors") or record.get("pending"):
+                continue
+            if record.get("id") is not None:
+                done.add(str(record["id"]))
+    return done
+
+
+def read_requests(handle: TextIO, default_agents: List[str]) -> Iterator[Tuple[str, Optional[PRDRequest], Dict[str, bool], Optional[str]]]:
+    """Yield ``(id, request, selected_agents, error)`` for each input line"""
+    for number, line in enumerate(handle, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            request = PRDRequest(**{key: record[key] for key in PRDRequest.model_fields if key in record})
+        except Exception as e:
+            yield f"line-{number}", None, {}, f"invalid request on line {number}: {e}"
+            continue
+        keys = record.get("agents") or default_agents
+        yield request_id(record, request), request, {key: key in keys for key in agents}, None
+
+
+class Progress:
+    def __init__(self, total: int, stream: TextIO = sys.stderr, interval: float = 5.0):
+        self.total = total
+        self.stream = stream
+        self.interval = interval
+        self.started = time.monotonic()
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.advisor_errors = 0
+        self._last_report = self.started
+
+    def update(self, ok: bool, advisor_errors: int = 0) -> None:
+        self.done += 1
+        self.failed += 0 if ok else 1
+        self.advisor_errors += advisor_errors
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def report(self, final: bool = False) -> None:
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        remaining = self.total - self.done - self.skipped
+        eta = f", ETA {remaining / rate:.0f}s" if rate and remaining > 0 and not final else ""
+        label = "done" if final else "progress"
+        print(
+            f"[{label}] {self.done + self.skipped}/{self.total} "
+            f"({self.skipped} resumed, {self.failed} failed, {self.advisor_errors} advisor errors) "
+            f"{rate:.2f} PRDs/s over {elapsed:.0f}s{eta}",
+            file=self.stream,
+            flush=True,
+        )
+
+
+async def run_batch(args: argparse.Namespace) -> int:
+    # Through the registry, so a reload of the advisors file mid-batch keeps them
+    if args.agent_concurrency or args.agent_rate:
+        agents.override(concurrency=args.agent_concurrency, rate=args.agent_rate)
+    if args.hard_deadline:
+        agents.override(hard_deadline=args.hard_deadline)
+
+    skip = completed_ids(args.output) if args.resume and args.output != "-" else set()
+    with open(args.input, encoding="utf-8") as handle:
+        total = sum(1 for line in handle if line.strip())
+    progress = Progress(total, interval=args.progress_interval)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "a" if args.resume else "w", encoding="utf-8")
+    default_agents = args.agents.split(",") if args.agents else list(agents)
+
+    def write(record: Dict[str, Any]) -> None:
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+
+    async def worker(items: Iterator) -> None:
+        # Workers pull from one shared iterator, so at most --concurrency PRDs are in flight
+        for rid, request, selected, error in items:
+            if rid in skip:
+                progress.skipped += 1
+                continue
+            if request is None:
+                write({"id": rid, "error": error})
+                progress.update(False)
+                continue
+            started = time.monotonic()
+            try:
+                response = await generate_prd(
+                    request,
+                    selected,
+                    use_cache=not args.no_cache,
+                    deadline=args.deadline,
+                    format=args.format,
+                    similarity=args.similarity,
+                    debate=args.debate,
+                    mode=args.mode
+                )
+            except Exception as e:
+                write({"id": rid, "error": str(e)})
+                progress.update(False)
+                continue
+            write({"id": rid, "elapsed": round(time.monotonic() - started, 3), **response.model_dump()})
+            progress.update(True, len(response.errors))
+
+    try:
+        with open(args.input, encoding="utf-8") as handle:
+            items = read_requests(handle, default_agents)
+            await asyncio.gather(*(worker(items) for _ in range(args.concurrency)))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        await aclose_client()
+    progress.report(final=True)
+    return 1 if progress.failed else 0
+
+
+async def run_history(args: argparse.Namespace) -> int:
+    if history is None:
+        print("PRD history is disabled (GAIA_HISTORY_DB=off)", file=sys.stderr)
+        return 1
+    if args.action == "search":
+        for entry in history.search(args.query, limit=args.limit):
+            stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.created_at))
+            print(f"{entry.response_id}  {stamp}  {entry.product_idea[:80]}")
+        return 0
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    count = 0
+    try:
+        for record in history.export(args.query, since=args.since, page_size=args.page_size):
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"[done] exported {count} PRDs", file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m gaia_prd", description="Gaia multi-agent PRD generator")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="generate PRDs for every request in a JSONL file")
+    batch.add_argument("input", help="JSONL file of PRDRequest objects")
+    batch.add_argument("-o", "--output", default="-", help="JSONL file for PRDResponse records (default: stdout)")
+    batch.add_argument("--agents", help=f"comma-separated advisors to consult (default: {','.join(agents)})")
+    batch.add_argument("--concurrency", type=int, default=8, help="PRDs generated at the same time")
+    batch.add_argument("--agent-concurrency", type=int, help="concurrent upstream calls per advisor")
+    batch.add_argument("--agent-rate", type=float, help="upstream calls per second per advisor")
+    batch.add_argument("--deadline", type=float, help="seconds before a PRD is written with pending advisors")
+    batch.add_argument("--hard-deadline", type=float, help="seconds before a single advisor call is abandoned")
+    batch.add_argument("--format", choices=FORMATS, default="markdown", help="format of the prd and dev_prompt fields")
+    batch.add_argument(
+        "--similarity",
+        type=float,
+        default=semantic_cache.default_threshold,
+        help="reuse analyses of earlier ideas at least this similar, 0-1 (default: GAIA_SEMANTIC_THRESHOLD if GAIA_SEMANTIC_CACHE is on)"
+    )
+    batch.add_argument(
+        "--mode",
+        choices=MODES,
+        default="full",
+        help="output budget: full analyses, or brief ones for cheap drafts"
+    )
+    batch.add_argument(
+        "--debate",
+        action="store_true",
+        help="let advisors refine their analyses after reading each other's, then write a synthesis"
+    )
+    batch.add_argument("--no-cache", action="store_true", help="do not reuse cached analyses")
+    batch.add_argument("--resume", action="store_true", help="append to --output, skipping ids already completed without advisor errors")
+    batch.add_argument("--progress-interval", type=float, default=5.0, help="seconds between progress reports")
+    batch.set_defaults(handler=run_batch)
+
+    serve = commands.add_parser("serve", help="run the HTTP job API (needs fastapi and uvicorn)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.set_defaults(handler=run_server)
+
+    past = commands.add_parser("history", help="search or export stored PRDs (GAIA_HISTORY_DB)")
+    past.add_argument("action", choices=["search", "export"])
+    past.add_argument("query", nargs="?", default="", help="full-text filter (every word as a prefix)")
+    past.add_argument("-o", "--output", default="-", help="JSONL file for export (default: stdout)")
+    past.add_argument("--since", type=float, help="only PRDs created after this Unix time")
+    past.add_argument("--limit", type=int, default=20, help="search results to show")
+    past.add_argument("--page-size", type=int, default=500, help="rows read per page during export")
+    past.set_defaults(handler=run_history)
+    return parser
+
+
+async def run_server(args: argparse.Namespace) -> int:
+    import uvicorn
+
+    from .api import app
+
+    await uvicorn.Server(uvicorn.Config(app, host=args.host, port=args.port)).serve()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return asyncio.run(args.handler(args))
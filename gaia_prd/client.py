@@ -0,0 +1,70 @@
+"""Pooled HTTP client shared by all Gaia agents.
+
+One ``httpx.AsyncClient`` is kept per event loop (httpx connection pools are
+bound to the loop they were first used on). In the Streamlit app that is the
+single background loop from :mod:`gaia_prd.runtime`, so every advisor call in
+the process reuses the same keep-alive / HTTP/2 connections.
+"""
+import asyncio
+import importlib.util
+import weakref
+from typing import Optional
+
+import httpx
+
+from .config import env_bool, env_float, env_int
+
+
+class ClientSettings:
+    def __init__(
+        self,
+        max_connections: int = env_int("GAIA_MAX_CONNECTIONS", 100),
+        max_keepalive_connections: int = env_int("GAIA_MAX_KEEPALIVE", 20),
+        keepalive_expiry: float = env_float("GAIA_KEEPALIVE_EXPIRY", 30.0),
+        http2: bool = env_bool("GAIA_HTTP2", True),
+        timeout: float = env_float("GAIA_TIMEOUT", 60.0),
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        # HTTP/2 needs the optional ``h2`` package (``httpx[http2]``)
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.timeout = timeout
+
+    def build(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=self.timeout,
+        )
+
+
+settings = ClientSettings()
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def configure(**kwargs) -> None:
+    """Override pool settings; only affects clients created afterwards"""
+    global settings
+    settings = ClientSettings(**kwargs)
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the pooled client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = settings.build()
+        _clients[loop] = client
+    return client
+
+
+async def aclose_client(loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+    """Close the pooled client for ``loop`` (defaults to the running loop)"""
+    client = _clients.pop(loop or asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
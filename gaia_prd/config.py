@@ -0,0 +1,33 @@
+"""Helpers for reading settings from environment variables."""
+import os
+from typing import List, Optional
+
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
+
+def env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    return os.environ.get(name) or default
+
+
+def env_list(name: str) -> List[str]:
+    """Comma-separated list, empty when unset"""
+    return [item.strip() for item in os.environ.get(name, "").split(",") if item.strip()]
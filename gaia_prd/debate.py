@@ -0,0 +1,190 @@
+"""Multi-round advisor debate, run as a dependency graph of calls.
+
+Round one is the usual independent analysis. In round two each advisor reads
+extractive summaries of some of the other advisors' analyses and refines its own,
+and a synthesis agent then writes the PRD's recommendations from the refined
+analyses. Every call starts as soon as the calls it reads have finished
+rather than at a barrier between rounds, and an advisor that fails only drops
+out of the inputs of the calls that read it. Each advisor reads only its next
+``GAIA_DEBATE_PEERS`` neighbours on the panel (default 2), so refinements
+start while other first-round calls are still running and the number of
+round-two inputs stays fixed as the panel grows; ``0`` reads the whole panel.
+
+Summaries keep the prompts bounded however long the analyses are:
+``GAIA_DEBATE_SUMMARY_WORDS`` for an advisor's own first analysis and
+``GAIA_DEBATE_CONTEXT_WORDS`` shared between the other advisors (or between
+all of them in the synthesis prompt).
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from .agent import GaiaAgent, agents
+from .budget import Budget, budgets
+from .config import env_int, env_list, env_str
+from .models import AgentResponse, PRDRequest
+from .summary import summarize
+
+SYNTHESIS = "synthesis"
+SUMMARY_WORDS = env_int("GAIA_DEBATE_SUMMARY_WORDS", 120)
+CONTEXT_WORDS = env_int("GAIA_DEBATE_CONTEXT_WORDS", 360)
+# Peers each advisor reads in round two; 0 for the whole panel
+PEERS = env_int("GAIA_DEBATE_PEERS", 2)
+# Peer summaries never shrink below this, however many advisors there are
+MIN_SUMMARY_WORDS = 40
+
+
+class Graph:
+    """Async calls that start as soon as the calls they depend on finish.
+
+    A node's dependencies must already be in the graph, so it is acyclic by
+    construction. ``run`` receives the results of the dependencies that
+    succeeded, keyed by node.
+    """
+
+    def __init__(self):
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def add(
+        self,
+        key: str,
+        run: Callable[[Dict[str, Any]], Awaitable[Any]],
+        after: Iterable[str] = ()
+    ) -> asyncio.Task:
+        upstream = {dependency: self.tasks[dependency] for dependency in after}
+
+        async def node() -> Any:
+            if upstream:
+                await asyncio.wait(upstream.values())
+            return await run({
+                dependency: task.result()
+                for dependency, task in upstream.items()
+                if not task.cancelled() and task.exception() is None
+            })
+
+        task = self.tasks[key] = asyncio.ensure_future(node())
+        return task
+
+
+def round_two(key: str) -> str:
+    return f"{key}/round2"
+
+
+def peers_of(key: str, consulted: List[str], limit: int = PEERS) -> List[str]:
+    """The advisors ``key`` reads in round two: the next ``limit`` on the
+    panel, wrapping around (all of them when ``limit`` is 0)"""
+    index = consulted.index(key)
+    others = consulted[index + 1:] + consulted[:index]
+    return others[:limit] if limit > 0 else others
+
+
+def summary_budget(count: int) -> int:
+    """Words per summary when ``count`` analyses share the context budget"""
+    return max(MIN_SUMMARY_WORDS, CONTEXT_WORDS // max(count, 1))
+
+
+def synthesizer(consulted: List[str]) -> GaiaAgent:
+    """The synthesis agent: ``GAIA_SYNTHESIS_URL`` if set, otherwise the
+    consulted advisors' own nodes in turn"""
+    url = env_str("GAIA_SYNTHESIS_URL")
+    endpoints = [url] + env_list("GAIA_SYNTHESIS_FALLBACK_URLS") if url else [agents[key].url for key in consulted]
+    return GaiaAgent(
+        "Synthesis",
+        endpoints[0],
+        "Weighing the advisory panel's views into one product strategy",
+        fallback_urls=endpoints[1:]
+    )
+
+
+def build_synthesis_prompt(request: PRDRequest, analyses: Dict[str, str], budget: Budget = budgets["full"]) -> str:
+    """``analyses`` maps advisor names to their (summarized) final analyses"""
+    panel = "\n".join(f"- {name}: {text}" for name, text in analyses.items())
+    return f"""You are the chair of an advisory panel writing the synthesis of a product requirements document.
+
+Product Idea: "{request.product_idea}"
+Target Audience: {request.target_audience}
+Timeline: {request.timeline}
+Budget Range: {request.budget_range}
+
+The advisors' analyses, summarized:
+{panel}
+
+Reconcile their views into concrete recommendations. Where they disagree, say which view you side with and why. Use exactly these four bold labels, each followed by two or three sentences:
+
+**Core Value Proposition:**
+**Technical Strategy:**
+**Business Model:**
+**Market Approach:**
+
+Keep it under {budget.synthesis_words} words. Respond in plain text, not JSON."""
+
+
+def advisor_graph(
+    request: PRDRequest,
+    consulted: List[str],
+    on_update: Optional[Callable[[str, str], None]] = None,
+    use_cache: bool = True,
+    similarity: Optional[float] = None,
+    debate: bool = False,
+    mode: str = "full"
+) -> Graph:
+    """Round-one analyses keyed by advisor key; with ``debate``, also the
+    round-two refinements (:func:`round_two` of the key) and the synthesis
+    (:data:`SYNTHESIS`).
+
+    Refinement and synthesis nodes resolve to None when there is nothing to
+    refine or synthesize. ``on_update`` receives ``(key, text)`` for every
+    node as it streams, refinements under the advisor's own key.
+    """
+    graph = Graph()
+    budget = budgets[mode]
+
+    def updates(key: str) -> Optional[Callable[[str], None]]:
+        if on_update is None:
+            return None
+        return lambda text: on_update(key, text)
+
+    for key in consulted:
+        graph.add(key, lambda inputs, key=key: agents[key].analyze(
+            request.product_idea, on_update=updates(key), use_cache=use_cache, similarity=similarity, mode=mode
+        ))
+    if not debate:
+        return graph
+
+    async def refine(key: str, inputs: Dict[str, AgentResponse]) -> Optional[AgentResponse]:
+        own = inputs.get(key)
+        peers = {other: result for other, result in inputs.items() if other != key and result.ok}
+        if own is None or not own.ok or not peers:
+            return None
+        per_peer = summary_budget(len(peers))
+        agent = agents[key]
+        own_budget = agent.budget(mode)
+        prompt = agent.build_refine_prompt(
+            request.product_idea,
+            summarize(own.analysis, SUMMARY_WORDS),
+            {agents[other].name: summarize(result.analysis, per_peer) for other, result in peers.items()},
+            own_budget
+        )
+        return await agent.complete(prompt, on_update=updates(key), use_cache=use_cache, max_tokens=own_budget.max_tokens)
+
+    for key in consulted:
+        graph.add(round_two(key), lambda inputs, key=key: refine(key, inputs), after=[key, *peers_of(key, consulted)])
+
+    async def synthesize(inputs: Dict[str, Optional[AgentResponse]]) -> Optional[AgentResponse]:
+        finals = {}
+        for key in consulted:
+            refined = inputs.get(round_two(key))
+            final = refined if refined is not None and refined.ok else inputs.get(key)
+            if final is not None and final.ok:
+                finals[agents[key].name] = final.analysis
+        if not finals:
+            return None
+        per_advisor = summary_budget(len(finals))
+        prompt = build_synthesis_prompt(
+            request, {name: summarize(text, per_advisor) for name, text in finals.items()}, budget
+        )
+        return await synthesizer(consulted).complete(
+            prompt, on_update=updates(SYNTHESIS), use_cache=use_cache, max_tokens=budget.synthesis_max_tokens
+        )
+
+    graph.add(SYNTHESIS, synthesize, after=[*consulted, *map(round_two, consulted)])
+    return graph
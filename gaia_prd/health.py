@@ -0,0 +1,164 @@
+"""Background health and latency probes of the advisor endpoints.
+
+Every ``GAIA_PROBE_INTERVAL`` seconds each advisor endpoint (primary and
+fallbacks) is sent a cheap ``GET`` of its ``/models`` listing on the shared
+background loop. Any answer below 500 counts as reachable; the probe latency
+is smoothed into an EWMA. An endpoint is ``down`` after
+``GAIA_PROBE_FAILURES`` failed probes in a row or while its circuit breaker
+is open, and ``slow`` when its latency exceeds ``GAIA_PROBE_SLOW_MS``.
+
+Agents try their healthiest endpoint first, and callers use
+:meth:`HealthMonitor.available` to leave out advisors whose every endpoint
+is down.
+"""
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from pydantic import BaseModel
+
+from .breaker import breakers, describe_error
+from .client import get_client
+from .config import env_float, env_int
+from .runtime import submit
+
+UNKNOWN = "unknown"
+UP = "up"
+SLOW = "slow"
+DOWN = "down"
+
+# Preference when ordering endpoints; unprobed ones keep their configured place
+_RANK = {UP: 0, UNKNOWN: 0, SLOW: 1, DOWN: 2}
+
+
+class EndpointStatus(BaseModel):
+    endpoint: str
+    state: str = UNKNOWN
+    # EWMA of successful probe latencies
+    latency_ms: Optional[float] = None
+    checked_at: Optional[float] = None
+    # Consecutive failed probes and the last failure
+    failures: int = 0
+    error: Optional[str] = None
+
+
+def probe_url(endpoint: str) -> str:
+    """The model listing next to a chat-completions endpoint (or the endpoint itself)"""
+    base, found, _ = endpoint.rpartition("/chat/completions")
+    return f"{base}/models" if found else endpoint
+
+
+class HealthMonitor:
+    def __init__(
+        self,
+        interval: float = env_float("GAIA_PROBE_INTERVAL", 30.0),
+        timeout: float = env_float("GAIA_PROBE_TIMEOUT", 5.0),
+        slow_ms: float = env_float("GAIA_PROBE_SLOW_MS", 3000.0),
+        max_failures: int = env_int("GAIA_PROBE_FAILURES", 2),
+        alpha: float = 0.3
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self.slow_ms = slow_ms
+        self.max_failures = max_failures
+        self.alpha = alpha
+        self._probes: Dict[str, EndpointStatus] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[concurrent.futures.Future] = None
+
+    def start(self) -> bool:
+        """Start probing on the background loop (once per process); False if
+        probing is disabled with ``GAIA_PROBE_INTERVAL=0``"""
+        if self.interval <= 0:
+            return False
+        with self._lock:
+            if self._task is None or self._task.done():
+                self._task = submit(self._run())
+        return True
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.interval)
+
+    async def probe_all(self) -> None:
+        # Imported here: agents rank their endpoints with this module
+        from .agent import agents
+
+        endpoints = {endpoint for agent in agents.values() for endpoint in agent.configured_endpoints}
+        await asyncio.gather(*(self.probe(endpoint) for endpoint in endpoints))
+
+    async def probe(self, endpoint: str) -> EndpointStatus:
+        started = time.perf_counter()
+        error = None
+        try:
+            response = await get_client().get(probe_url(endpoint), timeout=self.timeout)
+            if response.status_code >= 500:
+                error = f"HTTP {response.status_code}"
+        except Exception as e:
+            error = describe_error(e)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            previous = self._probes.get(endpoint) or EndpointStatus(endpoint=endpoint)
+            if error is None:
+                latency_ms = elapsed_ms if previous.latency_ms is None else (
+                    self.alpha * elapsed_ms + (1 - self.alpha) * previous.latency_ms
+                )
+                status = EndpointStatus(
+                    endpoint=endpoint,
+                    state=SLOW if latency_ms > self.slow_ms else UP,
+                    latency_ms=latency_ms,
+                    checked_at=time.time()
+                )
+            else:
+                failures = previous.failures + 1
+                status = previous.model_copy(update={
+                    "state": DOWN if failures >= self.max_failures else previous.state,
+                    "checked_at": time.time(),
+                    "failures": failures,
+                    "error": error
+                })
+            self._probes[endpoint] = status
+        return status
+
+    def status(self, endpoint: str) -> EndpointStatus:
+        """Latest probe of ``endpoint``, marked down while its breaker is open"""
+        with self._lock:
+            status = self._probes.get(endpoint) or EndpointStatus(endpoint=endpoint)
+        if breakers.is_open(endpoint):
+            status = status.model_copy(update={"state": DOWN, "error": status.error or "circuit breaker open"})
+        return status
+
+    def rank(self, endpoints: Iterable[str]) -> List[str]:
+        """``endpoints`` healthiest first, otherwise in their given order"""
+        return sorted(endpoints, key=lambda endpoint: _RANK[self.status(endpoint).state])
+
+    def advisor_status(self, key: str) -> EndpointStatus:
+        """Status of the best endpoint of advisor ``key``"""
+        from .agent import agents
+
+        statuses = [self.status(endpoint) for endpoint in agents[key].configured_endpoints]
+        return min(statuses, key=lambda status: (_RANK[status.state], status.latency_ms or 0))
+
+    def available(self, keys: Iterable[str]) -> List[str]:
+        """``keys`` without advisors that are down, or all of them if every one is"""
+        keys = list(keys)
+        up = [key for key in keys if self.advisor_status(key).state != DOWN]
+        return up or keys
+
+    def snapshot(self) -> Dict[str, EndpointStatus]:
+        from .agent import agents
+
+        return {key: self.advisor_status(key) for key in agents}
+
+
+health = HealthMonitor()
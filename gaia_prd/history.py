@@ -0,0 +1,263 @@
+"""Persistent history of generated PRDs with full-text search.
+
+Every finished PRD is stored in a SQLite file together with its request,
+timings and advisor metadata, and indexed with FTS5 on the product idea,
+target audience and PRD text. Past PRDs can be searched and reloaded
+instantly instead of being generated again, and exported page by page.
+
+The store lives in ``GAIA_HISTORY_DB`` (default ``gaia_history.db``; set it
+to ``off`` to disable) and is opened on first use.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .config import env_str
+from .models import PRDRequest, PRDResponse
+from .prd import DEV_PROMPT, PRD, prd_context
+from .render import render
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS prds (
+        id INTEGER PRIMARY KEY,
+        response_id TEXT UNIQUE NOT NULL,
+        created_at REAL NOT NULL,
+        session_id TEXT,
+        product_idea TEXT NOT NULL,
+        target_audience TEXT NOT NULL,
+        prd TEXT NOT NULL,
+        agents TEXT NOT NULL,
+        pending INTEGER NOT NULL,
+        errors INTEGER NOT NULL,
+        elapsed REAL,
+        deadline REAL,
+        request TEXT NOT NULL,
+        response TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS prds_created ON prds (created_at)",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS prds_fts USING fts5(
+        product_idea, target_audience, prd, content='prds', content_rowid='id'
+    )""",
+    # Keep the external-content index in step with the table
+    """CREATE TRIGGER IF NOT EXISTS prds_ai AFTER INSERT ON prds BEGIN
+        INSERT INTO prds_fts (rowid, product_idea, target_audience, prd)
+        VALUES (new.id, new.product_idea, new.target_audience, new.prd);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS prds_ad AFTER DELETE ON prds BEGIN
+        INSERT INTO prds_fts (prds_fts, rowid, product_idea, target_audience, prd)
+        VALUES ('delete', old.id, old.product_idea, old.target_audience, old.prd);
+    END""",
+]
+
+_SUMMARY_COLUMNS = "p.response_id, p.created_at, p.product_idea, p.target_audience, p.agents, p.pending, p.errors, p.elapsed"
+_TERM = re.compile(r"\w+", re.UNICODE)
+# Around matched terms in search snippets; control characters, so they cannot
+# clash with the Markdown of the PRD text itself
+MATCH_START, MATCH_END = "\x02", "\x03"
+_EMPHASIS = re.compile(r"[*#`]+")
+_MARKDOWN = re.compile(r"([\\_\[\]<>|~])")
+
+
+class HistoryEntry(BaseModel):
+    response_id: str
+    created_at: float
+    product_idea: str
+    target_audience: str
+    agents: List[str]
+    pending: int
+    errors: int
+    elapsed: Optional[float] = None
+    # Matching PRD text, matches between MATCH_START and MATCH_END
+    snippet: Optional[str] = None
+
+    def highlighted(self) -> Optional[str]:
+        """The snippet as Markdown: the PRD's own markup dropped and its matches in bold"""
+        if self.snippet is None:
+            return None
+        text = _MARKDOWN.sub(r"\\\1", " ".join(_EMPHASIS.sub("", self.snippet).split()))
+        return text.replace(MATCH_START, "**").replace(MATCH_END, "**")
+
+
+def fts_query(text: str) -> Optional[str]:
+    """FTS5 query matching every word of ``text`` as a prefix; None if empty"""
+    terms = _TERM.findall(text)
+    return " ".join(f'"{term}"*' for term in terms) or None
+
+
+class HistoryStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["HistoryStore"]:
+        path = env_str("GAIA_HISTORY_DB", "gaia_history.db")
+        if path.strip().lower() in ("off", "0", "false", "none"):
+            return None
+        return cls(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def record(
+        self,
+        request: PRDRequest,
+        response: PRDResponse,
+        elapsed: Optional[float] = None,
+        session_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+        format: str = "markdown"
+    ) -> None:
+        """Store a finished PRD; ``format`` is the one its documents were
+        rendered in, as the history keeps and indexes them as Markdown"""
+        if format != "markdown":
+            context = prd_context(request, response, deadline)
+            response = response.model_copy(update={
+                "prd": render(PRD, context, "markdown"),
+                "dev_prompt": render(DEV_PROMPT, context, "markdown"),
+            })
+        row = (
+            response.response_id,
+            response.created_at,
+            session_id,
+            request.product_idea,
+            request.target_audience,
+            response.prd,
+            json.dumps(response.agents),
+            len(response.pending),
+            len(response.errors),
+            elapsed,
+            deadline,
+            request.model_dump_json(),
+            # The PRD text is already a column
+            response.model_dump_json(exclude={"prd"}),
+        )
+        with self._lock:
+            self._connect().execute(
+                """INSERT OR IGNORE INTO prds (response_id, created_at, session_id, product_idea,
+                    target_audience, prd, agents, pending, errors, elapsed, deadline, request, response)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                row,
+            )
+
+    def search(self, text: str = "", limit: int = 20, offset: int = 0) -> List[HistoryEntry]:
+        """Newest PRDs, or the best matches for ``text`` (every word as a prefix)"""
+        query = fts_query(text)
+        with self._lock:
+            conn = self._connect()
+            if query is None:
+                rows = conn.execute(
+                    f"SELECT {_SUMMARY_COLUMNS}, NULL FROM prds p ORDER BY p.created_at DESC LIMIT ? OFFSET ?",
+                    (limit, offset),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    f"""SELECT {_SUMMARY_COLUMNS}, snippet(prds_fts, -1, ?, ?, '…', 12)
+                    FROM prds_fts JOIN prds p ON p.id = prds_fts.rowid
+                    WHERE prds_fts MATCH ? ORDER BY bm25(prds_fts, 10.0, 3.0, 1.0) LIMIT ? OFFSET ?""",
+                    (MATCH_START, MATCH_END, query, limit, offset),
+                ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def count(self, text: str = "") -> int:
+        query = fts_query(text)
+        with self._lock:
+            conn = self._connect()
+            if query is None:
+                return conn.execute("SELECT COUNT(*) FROM prds").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM prds_fts WHERE prds_fts MATCH ?", (query,)).fetchone()[0]
+
+    def load(self, response_id: str) -> Optional[Tuple[PRDRequest, PRDResponse, Optional[float]]]:
+        """``(request, response, deadline)`` of a stored PRD"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT request, response, prd, deadline FROM prds WHERE response_id = ?", (response_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        request, response, prd, deadline = row
+        return PRDRequest.model_validate_json(request), PRDResponse(**json.loads(response), prd=prd), deadline
+
+    def export(self, text: str = "", since: Optional[float] = None, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Yield every stored PRD, oldest first, as request/response records.
+
+        Rows are read in keyset-paginated pages of ``page_size``, so memory
+        stays flat however large the history is and writers are not blocked
+        for the whole export.
+        """
+        query = fts_query(text)
+        last_id = 0
+        while True:
+            with self._lock:
+                conn = self._connect()
+                if query is None:
+                    rows = conn.execute(
+                        """SELECT id, created_at, session_id, elapsed, deadline, request, response, prd FROM prds
+                        WHERE id > ? AND created_at >= ? ORDER BY id LIMIT ?""",
+                        (last_id, since or 0, page_size),
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        """SELECT p.id, p.created_at, p.session_id, p.elapsed, p.deadline, p.request, p.response, p.prd
+                        FROM prds_fts JOIN prds p ON p.id = prds_fts.rowid
+                        WHERE prds_fts MATCH ? AND p.id > ? AND p.created_at >= ? ORDER BY p.id LIMIT ?""",
+                        (query, last_id, since or 0, page_size),
+                    ).fetchall()
+            for row_id, created_at, session_id, elapsed, deadline, request, response, prd in rows:
+                yield {
+                    "created_at": created_at,
+                    "session_id": session_id,
+                    "elapsed": elapsed,
+                    "deadline": deadline,
+                    "request": json.loads(request),
+                    "response": {**json.loads(response), "prd": prd},
+                }
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1][0]
+
+    def delete(self, response_id: str) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM prds WHERE response_id = ?", (response_id,))
+
+    def prune(self, max_age: float) -> int:
+        """Delete PRDs older than ``max_age`` seconds; returns how many"""
+        with self._lock:
+            cursor = self._connect().execute("DELETE FROM prds WHERE created_at < ?", (time.time() - max_age,))
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _entry(row: tuple) -> HistoryEntry:
+        response_id, created_at, product_idea, target_audience, agents, pending, errors, elapsed, snippet = row
+        return HistoryEntry(
+            response_id=response_id,
+            created_at=created_at,
+            product_idea=product_idea,
+            target_audience=target_audience,
+            agents=json.loads(agents),
+            pending=pending,
+            errors=errors,
+            elapsed=elapsed,
+            snippet=snippet,
+        )
+
+
+history = HistoryStore.from_env()
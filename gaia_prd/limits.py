@@ -0,0 +1,281 @@
+"""Concurrency and rate limits for upstream advisor calls.
+
+Besides the optional per-agent caps used by batch runs, every upstream call
+goes through :data:`scheduler`: each endpoint admits a bounded number of
+concurrent calls (and optionally a rate), and when it is saturated waiting
+calls are granted in weighted round-robin order across sessions, so one user
+submitting PRDs in a loop cannot starve everybody else. Sessions can also be
+given their own token bucket.
+"""
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+from .config import env_float, env_int
+
+DEFAULT_SESSION = "default"
+
+# Session the current task is working for (set by ``generate_prd``)
+current_session: "contextvars.ContextVar[str]" = contextvars.ContextVar("gaia_session", default=DEFAULT_SESSION)
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, up to ``burst`` saved"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until ``tokens`` would be available, without taking them"""
+        self._refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        # The lock keeps waiters in FIFO order
+        async with self._lock:
+            delay = self.wait_time(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                self._refill()
+            self.tokens -= tokens
+
+
+class AgentLimits:
+    """Optional per-agent cap on concurrent calls and calls per second"""
+
+    def __init__(self, concurrency: Optional[int] = None, rate: Optional[float] = None):
+        self.concurrency = concurrency
+        self.rate = rate
+        self._semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        self._bucket = TokenBucket(rate) if rate else None
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self._semaphore is None:
+            if self._bucket is not None:
+                await self._bucket.acquire()
+            yield
+            return
+        async with self._semaphore:
+            if self._bucket is not None:
+                await self._bucket.acquire()
+            yield
+
+
+class EndpointScheduler:
+    """Admission control for one endpoint with weighted round-robin queues.
+
+    Calls are admitted on the event loop; the lock lets other threads (the
+    UI, ``/metrics``) read the queues while sessions come and go.
+    """
+
+    def __init__(self, endpoint: str, concurrency: int, rate: Optional[float] = None):
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+        self.active = 0
+        self.queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.weights: Dict[str, int] = {}
+        self.service_time: Optional[float] = None
+        self._bucket = TokenBucket(rate) if rate else None
+        self._order: Deque[str] = deque()
+        self._turn = 0
+        # Reentrant: _dispatch runs inside acquire and release
+        self._lock = threading.RLock()
+
+    @property
+    def queued(self) -> int:
+        with self._lock:
+            return sum(len(queue) for queue in self.queues.values())
+
+    async def acquire(self, session: str, weight: int = 1) -> None:
+        with self._lock:
+            waiter = None
+            if self.active < self.concurrency and not self.queues:
+                self.active += 1
+            else:
+                waiter = asyncio.get_running_loop().create_future()
+                if session not in self.queues:
+                    self.queues[session] = deque()
+                    if session not in self._order:
+                        self._order.append(session)
+                self.queues[session].append(waiter)
+                self.weights[session] = max(1, weight)
+                self._dispatch()
+        if waiter is not None:
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.release()  # granted just as we were cancelled
+                else:
+                    with self._lock:
+                        queue = self.queues.get(session)
+                        if queue is not None and waiter in queue:
+                            queue.remove(waiter)
+                            if not queue:
+                                del self.queues[session]
+                raise
+        if self._bucket is not None:
+            try:
+                await self._bucket.acquire()
+            except asyncio.CancelledError:
+                self.release()
+                raise
+
+    def release(self, held: Optional[float] = None) -> None:
+        with self._lock:
+            self.active -= 1
+            if held is not None:
+                # Exponentially weighted so the wait estimate follows the endpoint's current speed
+                self.service_time = held if self.service_time is None else 0.8 * self.service_time + 0.2 * held
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        # Called with the lock held
+        while self.active < self.concurrency:
+            session = self._next_session()
+            if session is None:
+                return
+            waiter = self.queues[session].popleft()
+            if waiter.done():
+                continue  # cancelled while queued
+            self.active += 1
+            waiter.set_result(None)
+
+    def _next_session(self) -> Optional[str]:
+        # Each session gets ``weight`` grants in a row, then goes to the back of the line
+        while self._order:
+            session = self._order[0]
+            if not self.queues.get(session):
+                self._order.popleft()
+                self.queues.pop(session, None)
+                self.weights.pop(session, None)
+                self._turn = 0
+                continue
+            if self._turn >= self.weights.get(session, 1):
+                self._order.rotate(-1)
+                self._turn = 0
+                continue
+            self._turn += 1
+            return session
+        return None
+
+    def estimated_wait(self, session: Optional[str] = None) -> float:
+        """Rough seconds until a new call (or ``session``'s last queued call) is admitted"""
+        with self._lock:
+            if self.active < self.concurrency and not self.queues:
+                return 0.0
+            mine = len(self.queues.get(session, ())) if session is not None else 0
+            if session is None or not mine:
+                ahead = self.queued + 1
+            else:
+                # Round robin: our k-th call waits for at most k calls from every other session
+                ahead = sum(min(len(queue), mine) for queue in self.queues.values())
+            return math.ceil(ahead / self.concurrency) * (self.service_time or 1.0)
+
+    def stats(self, session: Optional[str] = None) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "active": self.active,
+                "queued": self.queued,
+                "session_queued": len(self.queues.get(session, ())) if session is not None else 0,
+                "estimated_wait": self.estimated_wait(session),
+            }
+
+
+class FairScheduler:
+    """Per-endpoint :class:`EndpointScheduler` plus per-session token buckets.
+
+    State is kept per event loop, like the pooled HTTP client.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = env_int("GAIA_ENDPOINT_CONCURRENCY", 8),
+        endpoint_rate: float = env_float("GAIA_ENDPOINT_RATE", 0.0),
+        session_rate: float = env_float("GAIA_SESSION_RATE", 0.0),
+        session_burst: float = env_float("GAIA_SESSION_BURST", 10.0),
+        max_sessions: int = 10000
+    ):
+        self.concurrency = concurrency
+        self.endpoint_rate = endpoint_rate
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.max_sessions = max_sessions
+        self.weights: Dict[str, int] = {}
+        self._endpoints: Dict[Tuple[int, str], EndpointScheduler] = {}
+        self._session_buckets: "OrderedDict[Tuple[int, str], TokenBucket]" = OrderedDict()
+
+    def set_weight(self, session: str, weight: int) -> None:
+        """Give ``session`` ``weight`` grants per round-robin turn (default 1)"""
+        self.weights[session] = weight
+
+    def endpoint(self, endpoint: str) -> EndpointScheduler:
+        key = (id(asyncio.get_running_loop()), endpoint)
+        scheduler = self._endpoints.get(key)
+        if scheduler is None:
+            scheduler = EndpointScheduler(endpoint, self.concurrency, self.endpoint_rate or None)
+            self._endpoints[key] = scheduler
+        return scheduler
+
+    def _session_bucket(self, session: str) -> Optional[TokenBucket]:
+        if not self.session_rate:
+            return None
+        key = (id(asyncio.get_running_loop()), session)
+        bucket = self._session_buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.session_rate, self.session_burst)
+            self._session_buckets[key] = bucket
+            # Forget the least recently seen sessions
+            while len(self._session_buckets) > self.max_sessions:
+                self._session_buckets.popitem(last=False)
+        else:
+            self._session_buckets.move_to_end(key)
+        return bucket
+
+    @asynccontextmanager
+    async def slot(self, endpoint: str) -> AsyncIterator[None]:
+        """Hold one admitted call to ``endpoint`` for the current session"""
+        session = current_session.get()
+        bucket = self._session_bucket(session)
+        if bucket is not None:
+            await bucket.acquire()
+        scheduler = self.endpoint(endpoint)
+        await scheduler.acquire(session, self.weights.get(session, 1))
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            scheduler.release(time.monotonic() - started)
+
+    def stats(self, session: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Queue depth, active calls and estimated wait per endpoint (safe to
+        call from other threads; each endpoint's numbers are a consistent snapshot)
+
+        Counts are summed over the event loops calling an endpoint; the wait
+        is the longest of them.
+        """
+        totals: Dict[str, Dict[str, float]] = {}
+        for (_, endpoint), scheduler in list(self._endpoints.items()):
+            stats = scheduler.stats(session)
+            total = totals.setdefault(endpoint, dict.fromkeys(stats, 0))
+            for name, value in stats.items():
+                total[name] = max(total[name], value) if name == "estimated_wait" else total[name] + value
+        return totals
+
+
+scheduler = FairScheduler()
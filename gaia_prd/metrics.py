@@ -0,0 +1,252 @@
+"""Per-call latency/token instrumentation with Prometheus and JSONL export.
+
+Every ``GaiaAgent.analyze`` call produces a :class:`~gaia_prd.models.CallMetrics`
+record. Records are aggregated into counters and histograms rendered in the
+Prometheus text format (``/metrics`` on the API, or a small standalone server
+via ``GAIA_METRICS_PORT``) and, if ``GAIA_TRACE_LOG`` is set, appended to a
+JSONL trace log.
+"""
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import env_int, env_str
+from .models import CallMetrics
+
+# Metrics of the analyze call the current task is working for
+current_call: "contextvars.ContextVar[Optional[CallMetrics]]" = contextvars.ContextVar("gaia_current_call", default=None)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+PHASES = ("connect", "tls", "ttfb", "first_token", "total")
+
+
+class AttemptTrace:
+    """Everything measured about one HTTP attempt. Connection phases come from
+    httpx's ``trace`` request extension (pass the instance as the callback)"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.connect_ms: Optional[float] = None
+        self.tls_ms: Optional[float] = None
+        self.ttfb_ms: Optional[float] = None
+        self.first_token_ms: Optional[float] = None
+        self.status: Optional[int] = None
+        self.response_bytes: Optional[int] = None
+        self.usage: Optional[Dict[str, Any]] = None
+        self._phase_started: Dict[str, float] = {}
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    async def __call__(self, event: str, info: Dict[str, Any]) -> None:
+        now = time.perf_counter()
+        if event.endswith(".started"):
+            self._phase_started[event[:-len(".started")]] = now
+        elif event == "connection.connect_tcp.complete":
+            self.connect_ms = self._since("connection.connect_tcp", now)
+        elif event == "connection.start_tls.complete":
+            self.tls_ms = self._since("connection.start_tls", now)
+        elif event.endswith("receive_response_headers.complete"):
+            self.ttfb_ms = (now - self.started) * 1000
+
+    def _since(self, phase: str, now: float) -> Optional[float]:
+        started = self._phase_started.get(phase)
+        return (now - started) * 1000 if started is not None else None
+
+    def apply(self, call: CallMetrics) -> None:
+        call.endpoint = self.endpoint
+        call.connect_ms = self.connect_ms
+        call.tls_ms = self.tls_ms
+        call.ttfb_ms = self.ttfb_ms
+        call.first_token_ms = self.first_token_ms
+        call.status = self.status
+        call.response_bytes = self.response_bytes
+        if self.usage:
+            call.prompt_tokens = self.usage.get("prompt_tokens")
+            call.completion_tokens = self.usage.get("completion_tokens")
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    def __init__(self, trace_log: Optional[str] = None, recent: int = 500):
+        self.trace_log = trace_log
+        self.recent_limit = recent
+        self.recent: List[CallMetrics] = []
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._cache_hits: Dict[str, int] = defaultdict(int)
+        self._similar_hits: Dict[str, int] = defaultdict(int)
+        self._coalesced: Dict[str, int] = defaultdict(int)
+        self._retries: Dict[str, int] = defaultdict(int)
+        self._tokens: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._bytes: Dict[str, int] = defaultdict(int)
+        self._latency: Dict[Tuple[str, str], _Histogram] = defaultdict(_Histogram)
+        self._gauges: List[Callable[[], List[Tuple[str, Dict[str, str], float]]]] = []
+
+    def add_gauges(self, collect: Callable[[], List[Tuple[str, Dict[str, str], float]]]) -> None:
+        """Register a callback returning ``(name, labels, value)`` samples at scrape time"""
+        self._gauges.append(collect)
+
+    def record(self, call: CallMetrics) -> None:
+        outcome = "error" if call.error else "ok"
+        with self._lock:
+            self._calls[(call.agent, outcome)] += 1
+            if call.cache_hit:
+                self._cache_hits[call.agent] += 1
+            if call.similarity is not None:
+                self._similar_hits[call.agent] += 1
+            self.recent.append(call)
+            del self.recent[:-self.recent_limit]
+            if self.trace_log:
+                with open(self.trace_log, "a", encoding="utf-8") as handle:
+                    handle.write(call.model_dump_json() + "\n")
+            if call.coalesced:
+                # The upstream work was already counted for the caller that led the call
+                self._coalesced[call.agent] += 1
+                self._latency[(call.agent, "total")].observe((call.total_ms or 0) / 1000)
+                return
+            self._retries[call.agent] += call.retries
+            if call.prompt_tokens:
+                self._tokens[(call.agent, "prompt")] += call.prompt_tokens
+            if call.completion_tokens:
+                self._tokens[(call.agent, "completion")] += call.completion_tokens
+            if call.response_bytes:
+                self._bytes[call.agent] += call.response_bytes
+            for phase in PHASES:
+                value = getattr(call, f"{phase}_ms")
+                if value is not None:
+                    self._latency[(call.agent, phase)].observe(value / 1000)
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            family("gaia_advisor_calls_total", "counter", "Advisor analyses by outcome")
+            for (agent, outcome), value in sorted(self._calls.items()):
+                lines.append(f'gaia_advisor_calls_total{{agent="{_escape(agent)}",outcome="{outcome}"}} {value}')
+            family("gaia_advisor_cache_hits_total", "counter", "Analyses served from the response cache")
+            for agent, value in sorted(self._cache_hits.items()):
+                lines.append(f'gaia_advisor_cache_hits_total{{agent="{_escape(agent)}"}} {value}')
+            family("gaia_advisor_similar_reuse_total", "counter", "Cache hits that reused a near-duplicate idea's analysis")
+            for agent, value in sorted(self._similar_hits.items()):
+                lines.append(f'gaia_advisor_similar_reuse_total{{agent="{_escape(agent)}"}} {value}')
+            family("gaia_advisor_coalesced_total", "counter", "Analyses that joined an identical in-flight call")
+            for agent, value in sorted(self._coalesced.items()):
+                lines.append(f'gaia_advisor_coalesced_total{{agent="{_escape(agent)}"}} {value}')
+            family("gaia_advisor_retries_total", "counter", "Upstream retries after 429/5xx or transport errors")
+            for agent, value in sorted(self._retries.items()):
+                lines.append(f'gaia_advisor_retries_total{{agent="{_escape(agent)}"}} {value}')
+            family("gaia_advisor_tokens_total", "counter", "Tokens reported in completion usage")
+            for (agent, kind), value in sorted(self._tokens.items()):
+                lines.append(f'gaia_advisor_tokens_total{{agent="{_escape(agent)}",kind="{kind}"}} {value}')
+            family("gaia_advisor_response_bytes_total", "counter", "Response body bytes received")
+            for agent, value in sorted(self._bytes.items()):
+                lines.append(f'gaia_advisor_response_bytes_total{{agent="{_escape(agent)}"}} {value}')
+            family("gaia_advisor_latency_seconds", "histogram", "Advisor call latency by phase")
+            for (agent, phase), histogram in sorted(self._latency.items()):
+                labels = f'agent="{_escape(agent)}",phase="{phase}"'
+                for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                    lines.append(f'gaia_advisor_latency_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'gaia_advisor_latency_seconds_bucket{{{labels},le="+Inf"}} {histogram.total}')
+                lines.append(f"gaia_advisor_latency_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"gaia_advisor_latency_seconds_count{{{labels}}} {histogram.total}")
+
+        seen = set()
+        for collect in self._gauges:
+            for name, labels, value in collect():
+                if name not in seen:
+                    family(name, "gauge", name.replace("_", " "))
+                    seen.add(name)
+                label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry(trace_log=env_str("GAIA_TRACE_LOG"))
+
+
+def _runtime_gauges() -> List[Tuple[str, Dict[str, str], float]]:
+    from .breaker import OPEN, breakers
+    from .cache import response_cache
+    from .limits import scheduler
+    from .semantic import semantic_cache
+    from .singleflight import inflight
+
+    stats = response_cache.stats()
+    samples = [
+        ("gaia_cache_entries", {}, stats["entries"]),
+        ("gaia_cache_hit_ratio", {}, stats["hit_rate"]),
+        ("gaia_inflight_calls", {}, inflight.in_flight()),
+        ("gaia_semantic_index_entries", {}, semantic_cache.stats()["entries"]),
+    ]
+    for endpoint, state in breakers.states().items():
+        samples.append(("gaia_breaker_open", {"endpoint": endpoint}, 1 if state == OPEN else 0))
+    for endpoint, stats in scheduler.stats().items():
+        samples.append(("gaia_endpoint_active_calls", {"endpoint": endpoint}, stats["active"]))
+        samples.append(("gaia_endpoint_queued_calls", {"endpoint": endpoint}, stats["queued"]))
+    return samples
+
+
+registry.add_gauges(_runtime_gauges)
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def serve_metrics(port: Optional[int] = None, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """Start a background ``/metrics`` server once per process.
+
+    Uses ``GAIA_METRICS_PORT`` when no port is given; does nothing if neither
+    is set.
+    """
+    global _server
+    port = port or env_int("GAIA_METRICS_PORT", 0)
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="gaia-metrics", daemon=True).start()
+    return _server
@@ -0,0 +1,80 @@
+"""Request/response models shared by the UI, the CLI and the API."""
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+class PRDRequest(BaseModel):
+    product_idea: str
+    target_audience: str = ""
+    timeline: str = ""
+    budget_range: str = ""
+
+class CallMetrics(BaseModel):
+    """Timing and usage of one advisor call, as seen by one caller.
+
+    Latencies are milliseconds; ``connect_ms`` (which includes name
+    resolution) and ``tls_ms`` stay empty when a pooled connection was reused.
+    """
+    agent: str
+    endpoint: Optional[str] = None
+    started_at: float
+    connect_ms: Optional[float] = None
+    tls_ms: Optional[float] = None
+    ttfb_ms: Optional[float] = None
+    first_token_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+    status: Optional[int] = None
+    response_bytes: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cache_hit: bool = False
+    # Set when a near-duplicate idea's analysis was reused
+    similarity: Optional[float] = None
+    coalesced: bool = False
+    attempts: int = 0
+    retries: int = 0
+    error: Optional[str] = None
+
+class Reuse(BaseModel):
+    idea: str
+    similarity: float
+
+class AgentResponse(BaseModel):
+    analysis: str
+    error: Optional[str] = None
+    cached: bool = False
+    # The earlier, similar idea whose analysis was served instead of a new call
+    reused_from: Optional[Reuse] = None
+    metrics: Optional[CallMetrics] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class PRDResponse(BaseModel):
+    # Unique per generated PRD, so renderers can memoize on it
+    response_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    created_at: float = Field(default_factory=time.time)
+    # Output budget the advisors were asked to write to (see gaia_prd.budget)
+    mode: str = "full"
+    prd: str = ""
+    dev_prompt: str = ""
+    # Successful analyses by advisor key
+    analyses: Dict[str, str] = {}
+    # Kept for clients of the original four-advisor schema
+    elon_analysis: str = ""
+    warren_analysis: str = ""
+    peter_analysis: str = ""
+    steve_analysis: str = ""
+    agents: List[str] = []
+    pending: List[str] = []
+    errors: Dict[str, str] = {}
+    reused: Dict[str, Reuse] = {}
+    # Debate mode: advisors whose analysis was refined in round two, their
+    # round-one analyses, and the synthesis written from the refined ones
+    refined: List[str] = []
+    initial_analyses: Dict[str, str] = {}
+    synthesis: str = ""
+    calls: List[CallMetrics] = []
@@ -0,0 +1,104 @@
+"""Latency-driven execution policy: hedged requests and endpoint failover."""
+import asyncio
+import math
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+Publish = Callable[[str], None]
+Attempt = Callable[[str, Optional[Publish]], Awaitable[str]]
+
+
+class LatencyTracker:
+    """Rolling window of successful response latencies per endpoint"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        self._samples[endpoint].append(seconds)
+
+    def quantile(self, endpoint: str, q: float) -> Optional[float]:
+        """Return the ``q`` quantile, or None until enough samples exist"""
+        samples = self._samples.get(endpoint)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+latency = LatencyTracker()
+
+
+async def hedged_call(
+    attempt: Attempt,
+    endpoints: List[str],
+    hedge_delay: Callable[[str], float],
+    on_update: Optional[Publish] = None
+) -> str:
+    """Call ``attempt(endpoint, publish)`` with hedging and failover.
+
+    The first endpoint is tried immediately. If it has not produced anything
+    after ``hedge_delay(endpoint)`` seconds, the next endpoint is raced against
+    it; if an attempt fails, the next endpoint is started straight away. The
+    first attempt to publish partial output (or to finish) wins and the others
+    are cancelled. Raises the last error once every endpoint has failed.
+    """
+    remaining = list(endpoints)
+    running: Dict[asyncio.Task, str] = {}
+    winner: Optional[asyncio.Task] = None
+    last_error: Optional[BaseException] = None
+
+    def claim(task: asyncio.Task) -> None:
+        nonlocal winner
+        winner = task
+        for other in running:
+            if other is not task:
+                other.cancel()
+
+    def start() -> None:
+        endpoint = remaining.pop(0)
+        task: Optional[asyncio.Task] = None
+
+        def publish(text: str) -> None:
+            if winner is None:
+                claim(task)
+            if winner is task and on_update is not None:
+                on_update(text)
+
+        task = asyncio.ensure_future(attempt(endpoint, publish if on_update is not None else None))
+        running[task] = endpoint
+
+    start()
+    try:
+        while running:
+            timeout = None
+            if remaining and winner is None:
+                newest = list(running.values())[-1]
+                timeout = hedge_delay(newest)
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # Nothing back within the hedge delay: race the next endpoint
+                start()
+                continue
+            failed = False
+            for task in done:
+                running.pop(task)
+                if task.cancelled():
+                    continue
+                error = task.exception()
+                if error is None:
+                    claim(task)
+                    return task.result()
+                last_error = error
+                failed = True
+                if winner is task:
+                    winner = None
+            # Fail over immediately instead of waiting for the hedge delay
+            if remaining and (not running or (failed and winner is None)):
+                start()
+    finally:
+        for task in running:
+            task.cancel()
+    raise last_error or RuntimeError("no endpoints configured")
+
@@ -0,0 +1,295 @@
+"""PRD generation: fan out to the selected advisors and assemble the documents."""
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .advisors import advisors
+from .agent import agents
+from .breaker import describe_error
+from .budget import MODES, budgets, excerpt
+from .debate import SYNTHESIS, advisor_graph, round_two
+from .limits import current_session
+from .models import AgentResponse, CallMetrics, PRDRequest, PRDResponse
+from .render import Document, Each, Section, render
+
+# PRD section headings, also used for the live preview while advisors stream
+advisory_titles = advisors.view("section_title")
+
+# PRDResponse fields from before analyses were keyed by advisor
+LEGACY_ANALYSIS_KEYS = ("elon", "warren", "peter", "steve")
+
+# Synthesis used unless a debate produced one
+DEFAULT_SYNTHESIS = """**Core Value Proposition:** Focus on solving a real user problem with elegant simplicity while building defensible competitive advantages.
+
+**Technical Strategy:** Build scalable foundation with modern architecture, emphasizing user experience and rapid iteration capabilities.
+
+**Business Model:** Develop sustainable revenue streams based on strong unit economics and customer retention.
+
+**Market Approach:** Target early adopters, validate product-market fit, then scale with disciplined growth strategy."""
+
+PRD = Document(
+    Section("header", """# Product Requirements Document (PRD)
+
+**Product:** {product_idea}
+**Target Audience:** {target_audience}
+**Timeline:** {timeline}
+**Budget Range:** {budget_range}
+**Date:** {date}
+**Advisory Panel:** {advisor_list} ({advisor_count} advisor{plural})"""),
+    Section("executive_summary", """## Executive Summary
+This PRD synthesizes insights from {advisor_count} legendary business perspective{plural} to provide comprehensive product guidance."""),
+    Section(
+        "advisory_panel",
+        """## Advisory Panel Analysis
+
+{advisory_sections}""",
+        advisory_sections=Each("advisors", "### {section_title}\n{analysis}", empty="No advisory analysis available."),
+    ),
+    Section("synthesis", """## Synthesis & Recommendations
+
+{synthesis}"""),
+    Section("specifications", """## Product Specifications
+
+**Target Users:** {target_audience}
+**Development Timeline:** {timeline}
+**Budget Allocation:** {budget_range}"""),
+    Section("next_steps", """## Next Steps
+1. Validate core assumptions with target users
+2. Build MVP focusing on primary value proposition  
+3. Iterate based on user feedback and data
+4. Scale with proven product-market fit"""),
+    Section("footer", """---
+*Generated by Gaia Multi-Agent System with {advisor_count} AI advisor{plural}*"""),
+)
+
+DEV_PROMPT = Document(
+    Section("header", """# Development Prompt for {product_idea}
+
+**Target Audience:** {target_audience}
+**Timeline:** {timeline}
+**Budget:** {budget_range}
+
+Based on analysis from {advisor_list}, build a production-ready web application with these priorities:"""),
+    Section("core_requirements", """## Core Requirements
+- **User-Centric Design:** Tailored for {target_audience}
+- **Timeline Considerations:** Deliverable within {timeline}
+- **Budget Optimization:** Efficient development within {budget_range}"""),
+    Section("technical_implementation", """## Technical Implementation
+Use React/Next.js + TypeScript + Tailwind CSS with:
+- User authentication (Auth0/Supabase)
+- Responsive design (mobile-first)
+- Real-time features where appropriate
+- Analytics and user tracking
+- SEO optimization
+- Accessibility compliance"""),
+    Section("key_features", """## Key Features
+1. Compelling landing page with clear value prop for {target_audience}
+2. Streamlined user onboarding
+3. Core functionality solving main user problem
+4. Clean dashboard with actionable insights
+5. Account management and settings
+6. Mobile app-like experience"""),
+    Section("success_metrics", """## Success Metrics
+- User engagement and retention
+- Conversion rates and revenue per user
+- Performance metrics (Core Web Vitals)
+- Customer satisfaction scores"""),
+    Section("closing", """Build something {target_audience} will love, that scales efficiently, and creates lasting value.
+
+*Optimized for v0.dev, bolt.new, lovable.dev*
+*Advisory insights from: {advisor_list}*"""),
+)
+
+# Development prompt plus advisor excerpts, as offered in the UI
+BUILD_PROMPT = DEV_PROMPT.extend(
+    Section(
+        "advisory_insights",
+        """## AI Advisory Insights for Implementation
+
+{insights}""",
+        insights=Each("insights", "**{insight_title}:**\n{excerpt}", separator="\n\n"),
+    ),
+    Section("implementation_priority", """## Implementation Priority
+1. Start with core functionality that delivers immediate value
+2. Focus on user experience and interface design
+3. Build scalable architecture from day one
+4. Implement analytics to track key metrics
+5. Plan for iterative improvements based on user feedback
+
+**Copy this entire prompt and paste it into v0.dev, bolt.new, or lovable.dev for best results.**"""),
+)
+
+DOCUMENTS = {"prd": PRD, "dev_prompt": DEV_PROMPT, "build_prompt": BUILD_PROMPT}
+
+
+def prd_context(request: PRDRequest, response: PRDResponse, deadline: Optional[float] = None) -> Dict[str, Any]:
+    """Template fields for the PRD documents of one response"""
+    names = []
+    sections = []
+    insights = []
+    budget = budgets.get(response.mode, budgets["full"])
+    for key in response.agents:
+        advisor = advisors.get(key)
+        if advisor is None:
+            continue
+        names.append(advisor.name)
+        analysis = response.analyses.get(key, "")
+        if key in response.pending:
+            within = f"the {deadline:g}s deadline" if deadline else "the deadline"
+            text = f"⏳ *Pending: {advisor.name} AI had not finished within {within}.*"
+        elif key in response.errors:
+            text = f"⚠️ *{advisor.name} AI is unavailable right now ({response.errors[key]}).*"
+        else:
+            text = analysis
+        sections.append({"section_title": advisor.section_title, "analysis": text})
+        if analysis:
+            insights.append({"insight_title": advisor.insight_title, "excerpt": excerpt(analysis, budget.excerpt_tokens)})
+
+    if len(names) > 1:
+        advisor_list = ", ".join(names[:-1]) + f" and {names[-1]}"
+    else:
+        advisor_list = names[0] if names else "No advisors"
+    return {
+        **request.model_dump(),
+        "date": time.strftime("%Y-%m-%d", time.localtime(response.created_at)),
+        "advisor_list": advisor_list,
+        "advisor_count": len(names),
+        "plural": "s" if len(names) != 1 else "",
+        "advisors": sections,
+        "insights": insights,
+        "synthesis": response.synthesis.strip() or DEFAULT_SYNTHESIS,
+    }
+
+
+async def generate_prd(
+    request: PRDRequest,
+    selected_agents: Dict[str, bool],
+    on_update: Optional[Callable[[str, str], None]] = None,
+    use_cache: bool = True,
+    deadline: Optional[float] = None,
+    format: str = "markdown",
+    session_id: Optional[str] = None,
+    similarity: Optional[float] = None,
+    debate: bool = False,
+    mode: str = "full"
+) -> PRDResponse:
+    """Generate PRD by calling selected agents.
+
+    If ``on_update`` is given, advisors are streamed and it is called with
+    ``(agent_key, text_so_far)`` as tokens arrive. Cached analyses are reused
+    unless ``use_cache`` is False. With a ``deadline`` (seconds) the PRD is
+    rendered from whichever advisors finished in time and the rest are
+    marked as pending; their calls keep running so the result still lands
+    in the cache. ``format`` selects Markdown, HTML or JSON for the ``prd``
+    and ``dev_prompt`` documents. Upstream calls are scheduled fairly
+    between sessions; pass ``session_id`` to identify the caller. With a
+    ``similarity`` threshold, analyses of near-duplicate earlier ideas are
+    reused and reported in ``PRDResponse.reused``. With ``debate``, advisors
+    refine their analyses after reading each other's and a synthesis agent
+    writes the recommendations (see :mod:`gaia_prd.debate`); the synthesis
+    streams to ``on_update`` under the ``"synthesis"`` key. ``mode`` is the
+    output budget, ``"full"`` or ``"brief"`` (see :mod:`gaia_prd.budget`).
+    """
+    if mode not in budgets:
+        raise ValueError(f"unknown mode {mode!r}, expected one of {', '.join(MODES)}")
+    
+    # Call only selected advisory agents
+    consulted = [agent_key for agent_key in agents if selected_agents.get(agent_key)]
+    accepting_updates = True
+
+    def forward(agent_key: str, text: str) -> None:
+        if accepting_updates:
+            on_update(agent_key, text)
+    
+    # Tasks copy the context they are created in, so the advisor calls carry the session
+    session_token = current_session.set(session_id) if session_id else None
+    graph = advisor_graph(
+        request,
+        consulted,
+        on_update=forward if on_update is not None else None,
+        use_cache=use_cache,
+        similarity=similarity,
+        debate=debate,
+        mode=mode
+    )
+    if session_token is not None:
+        current_session.reset(session_token)
+    
+    # Run all agent calls concurrently
+    analyses = {}
+    initial_analyses = {}
+    refined = []
+    reused = {}
+    pending = []
+    errors = {}
+    calls = []
+    synthesis = ""
+    if graph.tasks:
+        started_at, started = time.time(), time.perf_counter()
+        await asyncio.wait(graph.tasks.values(), timeout=deadline)
+        accepting_updates = False
+
+        def outcome(node: str) -> Optional[AgentResponse]:
+            task = graph.tasks.get(node)
+            if task is None or not task.done():
+                if task is not None:
+                    calls.append(CallMetrics(
+                        agent=node_name(node),
+                        started_at=started_at,
+                        total_ms=(time.perf_counter() - started) * 1000,
+                        error="pending"
+                    ))
+                return None
+            if task.exception() is not None:
+                return AgentResponse(analysis="", error=describe_error(task.exception()))
+            result = task.result()
+            if result is not None and result.metrics is not None:
+                calls.append(result.metrics.model_copy(update={"agent": node_name(node)}))
+            return result
+        
+        for agent_key in consulted:
+            result = outcome(agent_key)
+            if result is None:
+                pending.append(agent_key)
+                continue
+            refinement = outcome(round_two(agent_key)) if debate else None
+            if result.ok and refinement is not None and refinement.ok:
+                initial_analyses[agent_key] = result.analysis
+                refined.append(agent_key)
+                result = refinement
+            if result.ok:
+                analyses[agent_key] = result.analysis
+                if result.reused_from is not None:
+                    reused[agent_key] = result.reused_from
+            else:
+                errors[agent_key] = result.error
+        if debate:
+            result = outcome(SYNTHESIS)
+            if result is not None and result.ok:
+                synthesis = result.analysis
+    
+    response = PRDResponse(
+        mode=mode,
+        analyses=analyses,
+        agents=consulted,
+        pending=pending,
+        errors=errors,
+        reused=reused,
+        refined=refined,
+        initial_analyses=initial_analyses,
+        synthesis=synthesis,
+        calls=calls,
+        **{f"{key}_analysis": analyses.get(key, "") for key in LEGACY_ANALYSIS_KEYS}
+    )
+    context = prd_context(request, response, deadline)
+    response.prd = render(PRD, context, format)
+    response.dev_prompt = render(DEV_PROMPT, context, format)
+    return response
+
+
+def node_name(node: str) -> str:
+    """Name of the caller behind a :func:`~gaia_prd.debate.advisor_graph` node, for call metrics"""
+    if node == SYNTHESIS:
+        return "Synthesis"
+    key, _, stage = node.partition("/")
+    return f"{agents[key].name} (round 2)" if stage else agents[key].name
@@ -0,0 +1,164 @@
+"""Precompiled document templates rendered as Markdown, HTML or JSON.
+
+Templates use ``str.format`` field syntax (``{name}`` or ``{name:spec}``) and
+are parsed once when they are created, so rendering is a single pass joining
+literals with looked-up values. A :class:`Document` is an ordered list of
+sections that can be rendered whole or streamed section by section.
+"""
+import html
+import json
+import re
+from string import Formatter
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+FORMATS = ("markdown", "html", "json")
+MEDIA_TYPES = {"markdown": "text/markdown", "html": "text/html", "json": "application/json"}
+
+
+class Template:
+    def __init__(self, source: str):
+        self.source = source
+        self.parts: List[Tuple[str, Optional[str], str]] = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if field is not None and (conversion or not field.isidentifier()):
+                raise ValueError(f"unsupported template field {{{field}}} in {source[:40]!r}")
+            self.parts.append((literal, field, spec or ""))
+
+    def render(self, context: Mapping[str, Any]) -> str:
+        out = []
+        for literal, field, spec in self.parts:
+            out.append(literal)
+            if field is not None:
+                value = context[field]
+                out.append(format(value, spec) if spec else str(value))
+        return "".join(out)
+
+
+class Each:
+    """Renders ``template`` once per item in ``context[key]``, each item's
+    fields layered over the outer context"""
+
+    def __init__(self, key: str, template: str, separator: str = "\n", empty: str = ""):
+        self.key = key
+        self.template = Template(template)
+        self.separator = separator
+        self.empty = empty
+
+    def render(self, context: Mapping[str, Any]) -> str:
+        items = context[self.key]
+        if not items:
+            return self.empty
+        return self.separator.join(self.template.render({**context, **item}) for item in items)
+
+
+class Section:
+    def __init__(self, name: str, template: str, **repeated: Each):
+        self.name = name
+        self.template = Template(template)
+        self.repeated = repeated
+
+    def render(self, context: Mapping[str, Any]) -> str:
+        if self.repeated:
+            context = {**context, **{field: each.render(context) for field, each in self.repeated.items()}}
+        return self.template.render(context)
+
+
+class Document:
+    def __init__(self, *sections: Section, separator: str = "\n\n"):
+        self.sections = list(sections)
+        self.separator = separator
+
+    def extend(self, *sections: Section) -> "Document":
+        """A new document with ``sections`` appended (the compiled sections are shared)"""
+        return Document(*self.sections, *sections, separator=self.separator)
+
+    def iter_sections(self, context: Mapping[str, Any]) -> Iterator[Tuple[str, str]]:
+        for section in self.sections:
+            yield section.name, section.render(context)
+
+
+def stream(document: Document, context: Mapping[str, Any], format: str = "markdown") -> Iterator[str]:
+    """Yield the rendered document in chunks, one or more per section"""
+    if format not in FORMATS:
+        raise ValueError(f"unknown format {format!r}, expected one of {', '.join(FORMATS)}")
+    if format == "json":
+        yield '{"sections": ['
+    elif format == "html":
+        yield "<article>\n"
+    for index, (name, text) in enumerate(document.iter_sections(context)):
+        if format == "markdown":
+            yield document.separator + text if index else text
+        elif format == "html":
+            yield f'<section data-section="{html.escape(name)}">\n{markdown_to_html(text)}\n</section>\n'
+        else:
+            yield ("," if index else "") + json.dumps({"name": name, "markdown": text}, ensure_ascii=False)
+    if format == "json":
+        yield "]}"
+    elif format == "html":
+        yield "</article>\n"
+
+
+def render(document: Document, context: Mapping[str, Any], format: str = "markdown") -> str:
+    return "".join(stream(document, context, format))
+
+
+_HEADING = re.compile(r"(#{1,6})\s+(.*)")
+_LIST_ITEM = re.compile(r"(?:[-*+]|(\d+)[.)])\s+(.*)")
+_INLINE = [
+    (re.compile(r"`([^`]+)`"), r"<code>\1</code>"),
+    (re.compile(r"\*\*(.+?)\*\*"), r"<strong>\1</strong>"),
+    (re.compile(r"(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?![*\w])"), r"<em>\1</em>"),
+]
+
+
+def _inline(text: str) -> str:
+    text = html.escape(text, quote=False)
+    for pattern, replacement in _INLINE:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def markdown_to_html(text: str) -> str:
+    """Convert the Markdown subset used in PRDs (headings, lists, rules,
+    emphasis, paragraphs) to HTML. Everything else is escaped as text."""
+    out: List[str] = []
+    paragraph: List[str] = []
+    list_tag: Dict[str, Optional[str]] = {"open": None}
+
+    def flush() -> None:
+        if paragraph:
+            out.append("<p>" + "<br>\n".join(paragraph) + "</p>")
+            paragraph.clear()
+        if list_tag["open"]:
+            out.append(f"</{list_tag['open']}>")
+            list_tag["open"] = None
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            flush()
+            continue
+        heading = _HEADING.fullmatch(stripped)
+        if heading:
+            flush()
+            level = len(heading.group(1))
+            out.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+            continue
+        if stripped in ("---", "***", "___"):
+            flush()
+            out.append("<hr>")
+            continue
+        item = _LIST_ITEM.fullmatch(stripped)
+        if item:
+            tag = "ol" if item.group(1) else "ul"
+            if list_tag["open"] != tag:
+                flush()
+                out.append(f"<{tag}>")
+                list_tag["open"] = tag
+            out.append(f"<li>{_inline(item.group(2))}</li>")
+            continue
+        if list_tag["open"]:
+            flush()
+        paragraph.append(_inline(stripped))
+    flush()
+    return "\n".join(out)
@@ -0,0 +1,110 @@
+"""Process-wide asyncio event loop running on a background thread.
+
+Streamlit re-executes the app script on every interaction, so anything created
+there (event loops, HTTP clients, in-flight tasks) is thrown away between
+reruns. Imported modules are not, which is why the loop lives here.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+import time
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background loop, starting it on first use"""
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="gaia-prd-loop", daemon=True)
+            _thread.start()
+        return _loop
+
+
+def submit(coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+    """Schedule a coroutine on the background loop from any thread"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+class Submission:
+    """Handle for work started with :func:`start`.
+
+    Holds the future plus the latest partial text reported for each key, so a
+    caller on another thread (a Streamlit rerun) can poll both without blocking.
+    """
+
+    def __init__(self):
+        self.future: Optional[concurrent.futures.Future] = None
+        self.started = time.monotonic()
+        self.version = 0
+        self._partial: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def update(self, key: str, text: str) -> None:
+        with self._lock:
+            self._partial[key] = text
+            self.version += 1
+
+    def partial(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._partial)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        return self.future.result(timeout)
+
+    def cancel(self) -> bool:
+        return self.future.cancel()
+
+
+def start(make: Callable[[Callable[[str, str], None]], Coroutine[Any, Any, Any]]) -> Submission:
+    """Submit ``make(on_update)`` to the background loop and return at once.
+
+    ``make`` receives a thread-safe ``on_update(key, text)`` callback that
+    records partial results on the returned :class:`Submission`.
+    """
+    submission = Submission()
+    submission.future = submit(make(submission.update))
+    return submission
+
+
+def run(coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the background loop and block until it finishes"""
+    return submit(coro).result(timeout)
+
+
+def shutdown(timeout: float = 5.0) -> None:
+    """Close shared resources and stop the background loop"""
+    global _loop, _thread
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop, _thread = None, None
+    if loop is None or loop.is_closed():
+        return
+
+    from .client import aclose_client
+
+    try:
+        asyncio.run_coroutine_threadsafe(aclose_client(), loop).result(timeout)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
+    if thread is not None:
+        thread.join(timeout)
+    if not loop.is_running():
+        loop.close()
+
+
+atexit.register(shutdown)
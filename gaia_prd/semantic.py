@@ -0,0 +1,302 @@
+"""Near-duplicate reuse of advisor analyses.
+
+Product ideas are embedded locally, CPU only and without downloads. Each
+advisor configuration keeps a brute-force NumPy index of the ideas it has
+analysed, pointing at their entries in the response cache. A new idea whose
+cosine similarity to an indexed one reaches the threshold is answered with
+that earlier analysis.
+
+By default ideas are embedded by hashing their words and n-grams
+(:class:`HashedEmbedder`). That measures shared wording, not meaning: an
+idea reworded with other words scores low, and a one-word change of
+audience can score high. Its default threshold therefore only lets through
+near-verbatim rewordings (order, punctuation, inflections). For reuse across
+real paraphrases, point ``GAIA_EMBEDDINGS_FILE`` at static word vectors
+(:class:`StaticEmbedder`), e.g. fastText ``.vec`` files or distilled
+embeddings saved as ``.npz``.
+"""
+import re
+import threading
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Protocol, Tuple
+
+import numpy as np
+
+from .config import env_bool, env_float, env_int, env_str
+
+DIMENSIONS = 1024
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or that the their them "
+    "they this to with which who will can our your you we".split()
+)
+_TOKEN = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ("ing", "ed", "es", "ly", "s")
+
+
+def _stem(word: str) -> str:
+    # Crude suffix stripping so "tracks", "tracked" and "tracking" share features
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def _features(text: str) -> List[tuple]:
+    words = [_stem(word) for word in _TOKEN.findall(text.lower()) if word not in _STOPWORDS]
+    features = [(word, 1.0) for word in words]
+    features += [(f"{a} {b}", 0.7) for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features += [(padded[i:i + 3], 0.3) for i in range(len(padded) - 2)]
+    return features
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class Embedder(Protocol):
+    dimensions: int
+    # Default similarity threshold for this kind of embedding
+    threshold: float
+    # Lowest threshold at which it still tells different ideas apart
+    min_threshold: float
+
+    def __call__(self, text: str) -> np.ndarray:
+        """Unit-length vector for ``text`` (all zeros if nothing is known of it)"""
+
+
+class HashedEmbedder:
+    """Signed feature hashing of words, word bigrams and character trigrams"""
+
+    # Reordered, repunctuated or reinflected ideas clear it; new words do not
+    threshold = 0.95
+    # Ideas for different audiences ("students" / "retirees") score 0.65-0.75,
+    # one changed feature close to 0.9
+    min_threshold = 0.92
+
+    def __init__(self, dimensions: int = DIMENSIONS):
+        self.dimensions = dimensions
+
+    def __call__(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        features = _features(text)
+        if not features:
+            return vector
+        # crc32 rather than hash(): stable across processes
+        hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature, _ in features), dtype=np.uint64, count=len(features))
+        weights = np.fromiter((weight for _, weight in features), dtype=np.float32, count=len(features))
+        signs = np.where(hashes & (1 << 31), -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, (hashes % self.dimensions).astype(np.intp), signs * weights)
+        return _unit(vector)
+
+
+def load_vectors(path: str, max_words: int) -> Tuple[List[str], np.ndarray]:
+    """Word vectors from an ``.npz`` file (``words`` and ``vectors`` arrays) or
+    a GloVe / fastText text file, at most ``max_words`` of them"""
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return [str(word) for word in data["words"][:max_words]], data["vectors"][:max_words].astype(np.float32)
+    words: List[str] = []
+    rows: List[np.ndarray] = []
+    with open(path, encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            parts = line.rstrip().split(" ")
+            if len(parts) <= 2:
+                continue  # fastText header: word count and dimensions
+            row = np.asarray(parts[1:], dtype=np.float32)
+            if rows and len(row) != len(rows[0]):
+                continue
+            words.append(parts[0])
+            rows.append(row)
+            if len(words) >= max_words:
+                break
+    if not rows:
+        raise ValueError(f"no word vectors in {path}")
+    return words, np.vstack(rows)
+
+
+class StaticEmbedder:
+    """Weighted mean of static word vectors, rarer words weighing more.
+
+    Vector files list words most frequent first, so frequencies are taken
+    from the rank (Zipf) for smooth inverse frequency weights.
+    """
+
+    # Averaged word vectors of different ideas on one topic still score high
+    threshold = 0.9
+    min_threshold = 0.8
+
+    def __init__(self, words: List[str], vectors: np.ndarray, smoothing: float = 1e-3):
+        self.dimensions = vectors.shape[1]
+        self.positions = {word: position for position, word in enumerate(words)}
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = (vectors / np.where(norms, norms, 1.0)).astype(np.float32)
+        frequency = 1.0 / np.arange(1, len(words) + 1)
+        frequency /= frequency.sum()
+        self.weights = (smoothing / (smoothing + frequency)).astype(np.float32)
+
+    @classmethod
+    def from_file(cls, path: str, max_words: int = env_int("GAIA_EMBEDDINGS_MAX_WORDS", 200000)) -> "StaticEmbedder":
+        return cls(*load_vectors(path, max_words))
+
+    def __call__(self, text: str) -> np.ndarray:
+        found = [
+            self.positions[word]
+            for word in _TOKEN.findall(text.lower())
+            if word not in _STOPWORDS and word in self.positions
+        ]
+        if not found:
+            return np.zeros(self.dimensions, dtype=np.float32)
+        return _unit(self.weights[found] @ self.vectors[found])
+
+
+def embed(text: str, dimensions: int = DIMENSIONS) -> np.ndarray:
+    """Unit-length hashed n-gram vector for ``text``"""
+    return HashedEmbedder(dimensions)(text)
+
+
+class Match(NamedTuple):
+    key: str
+    idea: str
+    similarity: float
+
+
+class SemanticIndex:
+    """Brute-force cosine index over a ring buffer of ``max_entries`` vectors"""
+
+    def __init__(self, max_entries: int = 5000, dimensions: int = DIMENSIONS):
+        self.max_entries = max_entries
+        self.vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self.keys: List[str] = []
+        self.ideas: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str, idea: str, vector: np.ndarray) -> None:
+        if key in self._positions:
+            return
+        if len(self.keys) < self.max_entries:
+            if len(self.keys) == len(self.vectors):
+                # Grow geometrically so adds stay amortised O(1)
+                grown = np.zeros((min(self.max_entries, max(16, 2 * len(self.vectors))), self.vectors.shape[1]), dtype=np.float32)
+                grown[:len(self.vectors)] = self.vectors
+                self.vectors = grown
+            position = len(self.keys)
+            self.keys.append(key)
+            self.ideas.append(idea)
+        else:
+            # Full: overwrite the oldest entry
+            position = self._next
+            self._next = (self._next + 1) % self.max_entries
+            del self._positions[self.keys[position]]
+            self.keys[position] = key
+            self.ideas[position] = idea
+        self.vectors[position] = vector
+        self._positions[key] = position
+
+    def search(self, vector: np.ndarray, threshold: float, limit: int = 3) -> List[Match]:
+        """Up to ``limit`` entries at least ``threshold`` similar, best first"""
+        if not self.keys:
+            return []
+        scores = self.vectors[:len(self.keys)] @ vector
+        best = np.argsort(scores)[::-1][:limit]
+        return [Match(self.keys[i], self.ideas[i], float(scores[i])) for i in best if scores[i] >= threshold]
+
+
+class SemanticCache:
+    """Per-namespace indexes of embedded ideas.
+
+    With an ``embeddings`` file the vectors are loaded on a worker thread on
+    first use; until then, or if they fail to load (see ``error``), nothing
+    is indexed or reused. Thresholds below the embedder's ``min_threshold``
+    are raised to it.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = env_bool("GAIA_SEMANTIC_CACHE", False),
+        threshold: Optional[float] = env_float("GAIA_SEMANTIC_THRESHOLD", 0.0) or None,
+        max_entries: int = env_int("GAIA_SEMANTIC_MAX_ENTRIES", 5000),
+        embeddings: Optional[str] = env_str("GAIA_EMBEDDINGS_FILE")
+    ):
+        self.enabled = enabled
+        self.embeddings = embeddings
+        kind = StaticEmbedder if embeddings else HashedEmbedder
+        self.min_threshold = kind.min_threshold
+        self.threshold = max(threshold or kind.threshold, self.min_threshold)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.error: Optional[str] = None
+        self._embedder: Optional[Embedder] = None if embeddings else HashedEmbedder()
+        self._loader: Optional[threading.Thread] = None
+        self._indexes: Dict[str, SemanticIndex] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def embedder(self) -> Optional[Embedder]:
+        """The embedder, or None while the embeddings file is (being) loaded"""
+        if self._embedder is None and self.error is None:
+            with self._lock:
+                if self._loader is None:
+                    self._loader = threading.Thread(target=self._load, name="gaia-embeddings", daemon=True)
+                    self._loader.start()
+        return self._embedder
+
+    def _load(self) -> None:
+        try:
+            self._embedder = StaticEmbedder.from_file(self.embeddings)
+        except Exception as e:
+            self.error = f"could not load {self.embeddings}: {e}"
+
+    @property
+    def paraphrases(self) -> bool:
+        """Whether reworded ideas can match, rather than near-verbatim ones only"""
+        return self.embeddings is not None
+
+    @property
+    def default_threshold(self) -> Optional[float]:
+        """Threshold to use when the caller does not choose; None when disabled"""
+        return self.threshold if self.enabled else None
+
+    def add(self, namespace: str, idea: str, key: str) -> None:
+        embedder = self.embedder
+        if embedder is None:
+            return
+        vector = embedder(idea)
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None:
+                index = self._indexes[namespace] = SemanticIndex(self.max_entries, embedder.dimensions)
+            index.add(key, idea, vector)
+
+    def search(self, namespace: str, idea: str, threshold: float) -> List[Match]:
+        embedder = self.embedder
+        if embedder is None:
+            return []
+        vector = embedder(idea)
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None:
+                return []
+            return index.search(vector, max(threshold, self.min_threshold))
+
+    def record_hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "entries": sum(len(index) for index in self._indexes.values())}
+
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,77 @@
+"""In-flight request coalescing ("singleflight").
+
+Concurrent callers asking for the same key share one upstream call: the first
+caller starts it, later callers wait on the same task. Partial results
+published by the running call are fanned out to every waiter, and a waiter
+that joins late is first replayed the latest partial result.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+Publish = Callable[[str], None]
+
+
+class _Flight:
+    def __init__(self):
+        self.task: Optional[asyncio.Future] = None
+        self.latest: Optional[str] = None
+        self.listeners: List[Publish] = []
+
+    def publish(self, text: str) -> None:
+        self.latest = text
+        for listener in list(self.listeners):
+            listener(text)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[Tuple[int, str], _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[Publish], Awaitable[Any]],
+        on_update: Optional[Publish] = None
+    ) -> Any:
+        """Run ``fn(publish)`` once per key among concurrent callers.
+
+        The shared call is shielded, so a waiter being cancelled does not
+        cancel the upstream request for everybody else. Waiters with
+        ``on_update`` always see the final result, even if the call that
+        served them was not publishing partial results.
+        """
+        flight_key = (id(asyncio.get_running_loop()), key)
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[flight_key] = flight
+            flight.task = asyncio.ensure_future(fn(flight.publish))
+            flight.task.add_done_callback(lambda _: self._forget(flight_key, flight))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            if on_update is not None and flight.latest is not None:
+                on_update(flight.latest)
+
+        if on_update is not None:
+            flight.listeners.append(on_update)
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            if on_update is not None:
+                flight.listeners.remove(on_update)
+        if on_update is not None and isinstance(result, str) and result != flight.latest:
+            on_update(result)
+        return result
+
+    def _forget(self, flight_key: Tuple[int, str], flight: _Flight) -> None:
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+
+inflight = SingleFlight()
@@ -0,0 +1,76 @@
+"""Local extractive summaries for keeping prompts within a word budget.
+
+Sentences are scored by how many of the text's frequent content words they
+contain (a classic frequency summarizer), and the best ones that fit the
+budget are kept in their original order. Nothing leaves the process.
+"""
+import math
+import re
+from collections import Counter
+from typing import List
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can for from has have how in into is it its more most not of on or "
+    "so such than that the their them then there these they this to was were what when which while who "
+    "will with would you your our we should could also very".split()
+)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(*A-Z0-9])")
+# List bullets, numbering, headings and emphasis markers
+_MARKUP = re.compile(r"^\s*(?:[#>]+|[-*+•]|\d+[.)])\s*|\*\*|__")
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def sentences(text: str) -> List[str]:
+    """Sentences of ``text`` with Markdown list and heading markers and
+    short label lines ("Key Opportunities:") removed"""
+    out = []
+    for line in text.splitlines():
+        line = _MARKUP.sub("", line).strip()
+        if line.endswith(":") and word_count(line) <= 6:
+            continue
+        out.extend(part.strip() for part in _SENTENCE_END.split(line) if part.strip())
+    return out
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+def clip(text: str, max_words: int) -> str:
+    """The first ``max_words`` words of ``text``, marked with an ellipsis if cut"""
+    words = text.split()
+    if len(words) <= max_words:
+        return " ".join(words)
+    return " ".join(words[:max_words]).rstrip(",;:") + "…"
+
+
+def summarize(text: str, max_words: int) -> str:
+    """Extractive summary of ``text`` in at most ``max_words`` words"""
+    # Models sometimes repeat themselves; a summary never needs to
+    parts = list(dict.fromkeys(sentences(text)))
+    if sum(word_count(part) for part in parts) <= max_words:
+        return " ".join(parts)
+
+    frequency = Counter(
+        word for part in parts for word in _WORD.findall(part.lower()) if word not in _STOPWORDS and len(word) > 2
+    )
+    scores = []
+    for index, part in enumerate(parts):
+        words = set(_WORD.findall(part.lower()))
+        score = sum(frequency[word] for word in words) / math.sqrt(word_count(part) or 1)
+        # Headings and lead-in sentences tend to state the point
+        if index == 0:
+            score *= 1.5
+        scores.append((score, index))
+
+    chosen = []
+    budget = max_words
+    for score, index in sorted(scores, reverse=True):
+        length = word_count(parts[index])
+        if length <= budget:
+            chosen.append(index)
+            budget -= length
+    if not chosen:
+        # Every sentence is longer than the budget: clip the best one
+        return clip(parts[max(scores)[1]], max_words)
+    return " ".join(parts[index] for index in sorted(chosen))
@@ -1,250 +1,184 @@
 import streamlit as st
-import requests
 import time
-import json
-import httpx
-import asyncio
-from typing import Dict, Any
-from pydantic import BaseModel
+import uuid
+from gaia_prd import PRDRequest, PRDResponse, advisors, advisory_titles, agents, generate_prd, prd_context, render
+from gaia_prd.budget import MODES, budgets, load_tokenizer
+from gaia_prd.cache import response_cache
+from gaia_prd.health import DOWN, SLOW, health
+from gaia_prd.history import history
+from gaia_prd.limits import scheduler
+from gaia_prd.metrics import serve_metrics
+from gaia_prd.prd import DOCUMENTS
+from gaia_prd.semantic import semantic_cache
+from gaia_prd.runtime import start
+from gaia_prd.singleflight import inflight
 
 st.set_page_config(page_title="Gaia PRD Generator", page_icon="🤖")
 st.markdown("""<style>.main .block-container { max-width: 1280px; }</style>""", unsafe_allow_html=True)
 
-class PRDRequest(BaseModel):
-    product_idea: str
-    target_audience: str = ""
-    timeline: str = ""
-    budget_range: str = ""
-
-class AgentResponse(BaseModel):
-    analysis: str
-
-class PRDResponse(BaseModel):
-    prd: str
-    dev_prompt: str
-    elon_analysis: str = ""
-    warren_analysis: str = ""
-    peter_analysis: str = ""
-    steve_analysis: str = ""
-
-class GaiaAgent:
-    def __init__(self, name: str, url: str, perspective: str):
-        self.name = name
-        self.url = url
-        self.perspective = perspective
-
-    async def analyze(self, product_idea: str) -> str:
-        prompt = f"""You are {self.name} analyzing a product idea.
-
-Product Idea: "{product_idea}"
-
-Your expertise: {self.perspective}
-
-Provide analysis covering:
-1. Key opportunities and challenges
-2. Strategic recommendations
-3. Important considerations
-4. Success factors
+# Prometheus endpoint for this process, if GAIA_METRICS_PORT is set
+serve_metrics()
+# Background latency / health probes of the advisor nodes (once per process)
+health.start()
+# Tokenizer vocabulary, loaded on a worker thread; token counts are estimated until then
+load_tokenizer()
+
+def render_debug_panel(calls):
+    """Waterfall of the concurrent advisor calls behind one PRD"""
+    st.subheader("🔬 Advisor Call Waterfall")
+    origin = min(call["started_at"] for call in calls)
+    segments = []
+    for call in calls:
+        start = (call["started_at"] - origin) * 1000
+        end = start + (call.get("total_ms") or 0)
+        if call.get("similarity") is not None:
+            phases = [("reused similar idea", end)]
+        elif call.get("cache_hit"):
+            phases = [("cache hit", end)]
+        elif call.get("coalesced"):
+            phases = [("shared in-flight call", end)]
+        elif call.get("error") == "pending":
+            phases = [("pending", end)]
+        else:
+            cursor = start
+            phases = []
+            for phase, duration in (("connect", call.get("connect_ms")), ("tls", call.get("tls_ms"))):
+                if duration:
+                    cursor += duration
+                    phases.append((phase, cursor))
+            if call.get("ttfb_ms"):
+                phases.append(("waiting (TTFB)", max(cursor, start + call["ttfb_ms"])))
+            phases.append(("streaming / download", end))
+        cursor = start
+        for phase, phase_end in phases:
+            segments.append({"advisor": call["agent"], "phase": phase, "start_ms": cursor, "end_ms": max(cursor, phase_end)})
+            cursor = phase_end
+    
+    st.vega_lite_chart(
+        {
+            "data": {"values": segments},
+            "mark": {"type": "bar", "tooltip": True},
+            "encoding": {
+                "y": {"field": "advisor", "type": "nominal", "title": None},
+                "x": {"field": "start_ms", "type": "quantitative", "title": "ms since PRD start"},
+                "x2": {"field": "end_ms"},
+                "color": {"field": "phase", "type": "nominal"}
+            }
+        }
+    )
+    st.dataframe(
+        [
+            {
+                "advisor": call["agent"],
+                "status": call.get("status"),
+                "total ms": round(call["total_ms"]) if call.get("total_ms") is not None else None,
+                "TTFB ms": round(call["ttfb_ms"]) if call.get("ttfb_ms") is not None else None,
+                "first token ms": round(call["first_token_ms"]) if call.get("first_token_ms") is not None else None,
+                "prompt tokens": call.get("prompt_tokens"),
+                "completion tokens": call.get("completion_tokens"),
+                "bytes": call.get("response_bytes"),
+                "cache hit": call.get("cache_hit"),
+                "similarity": call.get("similarity"),
+                "retries": call.get("retries"),
+                "error": call.get("error")
+            }
+            for call in calls
+        ]
+    )
 
-Keep response focused and actionable (300-400 words). Think from your unique perspective.
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_document(response_id, document, format, _request, _data, _deadline):
+    """One PRD document rendered from the stored response, memoized per response"""
+    context = prd_context(PRDRequest(**_request), PRDResponse(**_data), _deadline)
+    return render(DOCUMENTS[document], context, format)
 
-Respond in plain text, not JSON."""
+def export_name(prefix, extension="md"):
+    return f"{prefix}_{st.session_state.product_idea.replace(' ', '_')[:30]}.{extension}"
 
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.url,
-                    json={
-                        "model": "gpt-3.5-turbo",
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": 0.7,
-                        "max_tokens": 1000,
-                        "stream": False
-                    },
-                    timeout=60.0
-                )
-                
-                response_text = response.text
-                
-                # Handle both JSON and plain text responses
-                try:
-                    data = json.loads(response_text)
-                    if 'choices' in data and data['choices']:
-                        return data['choices'][0]['message']['content']
-                    else:
-                        return response_text
-                except json.JSONDecodeError:
-                    return response_text
-                    
-        except Exception as e:
-            return f"Analysis from {self.name}: Due to technical issues, unable to provide detailed analysis. However, {product_idea} shows potential and should be evaluated further."
-
-# ===== AGENT DEFINITIONS =====
-agents = {
-    "elon": GaiaAgent(
-        "Elon Musk", 
-        "https://0xf3402fdc5684b8cd331b09a37caa176ce7efb686.gaia.domains/v1/chat/completions",
-        "Innovation, scaling, and disruptive technology"
-    ),
-    "warren": GaiaAgent(
-        "Warren Buffet",
-        "https://0xfd0ca669e92e705d337f05d8f5f12c4d0b9dfb9d.gaia.domains/v1/chat/completions", 
-        "Business fundamentals and long-term value"
-    ),
-    "peter": GaiaAgent(
-        "Peter Thiel",
-        "https://0x7a967b4b6b1f82c6d3a4a53d2e28eae596d8d6d9.gaia.domains/v1/chat/completions",
-        "Zero-to-one innovation and monopoly strategy"
-    ),
-    "steve": GaiaAgent(
-        "Steve Jobs",
-        "https://0x30650e408f4e4307cbda0a12070aaacd8f2d743f.gaia.domains/v1/chat/completions",
-        "Design excellence and user experience"
+def render_stored(document, format="markdown"):
+    data = st.session_state.response_data
+    return render_document(
+        data["response_id"], document, format,
+        st.session_state.prd_request, data, st.session_state.prd_request_deadline
     )
-}
 
-async def generate_prd(request: PRDRequest, selected_agents: Dict[str, bool]) -> PRDResponse:
-    """Generate PRD by calling selected agents"""
-    
-    # Call only selected advisory agents
-    results = {}
-    tasks = []
-    
-    for agent_key, selected in selected_agents.items():
-        if selected and agent_key in agents:
-            tasks.append((agent_key, agents[agent_key].analyze(request.product_idea)))
-    
-    # Run all agent calls concurrently
-    if tasks:
-        agent_results = await asyncio.gather(*[task[1] for task in tasks], return_exceptions=True)
-        
-        for i, (agent_key, _) in enumerate(tasks):
-            result = agent_results[i]
-            if isinstance(result, Exception):
-                results[agent_key] = f"Unable to get analysis from {agents[agent_key].name} AI"
-            else:
-                results[agent_key] = result
-    
-    # Count selected advisors
-    selected_count = sum(selected_agents.values())
-    advisor_names = []
-    if selected_agents.get('elon'): advisor_names.append("Elon Musk")
-    if selected_agents.get('warren'): advisor_names.append("Warren Buffet") 
-    if selected_agents.get('peter'): advisor_names.append("Peter Thiel")
-    if selected_agents.get('steve'): advisor_names.append("Steve Jobs")
-    
-    advisor_list = ", ".join(advisor_names[:-1]) + f" and {advisor_names[-1]}" if len(advisor_names) > 1 else advisor_names[0] if advisor_names else "No advisors"
-    
-    # Generate dynamic advisory panel section
-    advisory_sections = []
-    
-    if selected_agents.get('elon') and 'elon' in results:
-        advisory_sections.append(f"""### 🚀 Innovation & Scaling Perspective (Elon Musk)
-{results['elon']}""")
-    
-    if selected_agents.get('warren') and 'warren' in results:
-        advisory_sections.append(f"""### 💰 Business Fundamentals Perspective (Warren Buffet)
-{results['warren']}""")
-    
-    if selected_agents.get('peter') and 'peter' in results:
-        advisory_sections.append(f"""### 🎯 Strategic Monopoly Perspective (Peter Thiel)
-{results['peter']}""")
-    
-    if selected_agents.get('steve') and 'steve' in results:
-        advisory_sections.append(f"""### 🎨 Design Excellence Perspective (Steve Jobs)
-{results['steve']}""")
+@st.fragment
+def render_prd_panel(data):
+    """PRD with download and a raw-markdown toggle; reruns on its own"""
+    # Rendered from the stored analyses: a reloaded API job may have been rendered as HTML or JSON
+    prd_content = render_stored("prd")
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        # Download PRD as markdown file
+        st.download_button(
+            label="📥 Download PRD",
+            data=prd_content,
+            file_name=export_name("PRD"),
+            mime="text/markdown",
+            on_click="ignore"
+        )
+        st.download_button(
+            label="🌐 Download HTML",
+            data=render_stored("prd", "html"),
+            file_name=export_name("PRD", "html"),
+            mime="text/html",
+            on_click="ignore"
+        )
+        raw = st.toggle(
+            "Raw markdown",
+            key=f"prd_raw_{data['response_id']}",
+            help="Show the markdown source with a copy button"
+        )
     
-    # Generate comprehensive PRD
-    prd_content = f"""# Product Requirements Document (PRD)
-
-**Product:** {request.product_idea}
-**Target Audience:** {request.target_audience}
-**Timeline:** {request.timeline}
-**Budget Range:** {request.budget_range}
-**Date:** {time.strftime('%Y-%m-%d')}
-**Advisory Panel:** {advisor_list} ({selected_count} advisor{"s" if selected_count != 1 else ""})
-
-## Executive Summary
-This PRD synthesizes insights from {selected_count} legendary business perspective{"s" if selected_count != 1 else ""} to provide comprehensive product guidance.
-
-## Advisory Panel Analysis
-
-{chr(10).join(advisory_sections) if advisory_sections else "No advisory analysis available."}
-
-## Synthesis & Recommendations
-
-**Core Value Proposition:** Focus on solving a real user problem with elegant simplicity while building defensible competitive advantages.
-
-**Technical Strategy:** Build scalable foundation with modern architecture, emphasizing user experience and rapid iteration capabilities.
-
-**Business Model:** Develop sustainable revenue streams based on strong unit economics and customer retention.
-
-**Market Approach:** Target early adopters, validate product-market fit, then scale with disciplined growth strategy.
-
-## Product Specifications
-
-**Target Users:** {request.target_audience}
-**Development Timeline:** {request.timeline}
-**Budget Allocation:** {request.budget_range}
-
-## Next Steps
-1. Validate core assumptions with target users
-2. Build MVP focusing on primary value proposition  
-3. Iterate based on user feedback and data
-4. Scale with proven product-market fit
-
----
-*Generated by Gaia Multi-Agent System with {selected_count} AI advisor{"s" if selected_count != 1 else ""}*"""
-
-    dev_prompt = f"""# Development Prompt for {request.product_idea}
-
-**Target Audience:** {request.target_audience}
-**Timeline:** {request.timeline}
-**Budget:** {request.budget_range}
-
-Based on analysis from {advisor_list}, build a production-ready web application with these priorities:
-
-## Core Requirements
-- **User-Centric Design:** Tailored for {request.target_audience}
-- **Timeline Considerations:** Deliverable within {request.timeline}
-- **Budget Optimization:** Efficient development within {request.budget_range}
-
-## Technical Implementation
-Use React/Next.js + TypeScript + Tailwind CSS with:
-- User authentication (Auth0/Supabase)
-- Responsive design (mobile-first)
-- Real-time features where appropriate
-- Analytics and user tracking
-- SEO optimization
-- Accessibility compliance
-
-## Key Features
-1. Compelling landing page with clear value prop for {request.target_audience}
-2. Streamlined user onboarding
-3. Core functionality solving main user problem
-4. Clean dashboard with actionable insights
-5. Account management and settings
-6. Mobile app-like experience
-
-## Success Metrics
-- User engagement and retention
-- Conversion rates and revenue per user
-- Performance metrics (Core Web Vitals)
-- Customer satisfaction scores
-
-Build something {request.target_audience} will love, that scales efficiently, and creates lasting value.
+    with col1:
+        if raw:
+            st.code(prd_content, language="markdown")
+        else:
+            st.markdown(prd_content)
 
-*Optimized for v0.dev, bolt.new, lovable.dev*
-*Advisory insights from: {advisor_list}*"""
+@st.fragment
+def render_dev_prompt_panel(data):
+    """Development prompt (memoized per response) with download and copy"""
+    enhanced_dev_prompt = render_stored("build_prompt")
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        # Download enhanced dev prompt
+        st.download_button(
+            label="📥 Download Prompt",
+            data=enhanced_dev_prompt,
+            file_name=export_name("DevPrompt"),
+            mime="text/markdown",
+            on_click="ignore"
+        )
+    
+    with col1:
+        st.code(enhanced_dev_prompt, language="markdown")
 
-    return PRDResponse(
-        prd=prd_content,
-        dev_prompt=dev_prompt,
-        elon_analysis=results.get('elon', '') if selected_agents.get('elon') else '',
-        warren_analysis=results.get('warren', '') if selected_agents.get('warren') else '',
-        peter_analysis=results.get('peter', '') if selected_agents.get('peter') else '',
-        steve_analysis=results.get('steve', '') if selected_agents.get('steve') else ''
-    )
+def health_badge(status):
+    """Short health / latency label of an advisor's best node"""
+    if status.state == DOWN:
+        return "🔴 down"
+    if status.latency_ms is None:
+        return ""
+    return f"{'🟠' if status.state == SLOW else '🟢'} {status.latency_ms:,.0f} ms"
+
+def load_history_entry(response_id):
+    """Show a stored PRD as the current result, without asking the advisors again"""
+    stored = history.load(response_id)
+    if stored is None:
+        return
+    request, response, deadline = stored
+    if st.session_state.get("prd_job") is not None:
+        st.session_state.prd_job.cancel()
+        st.session_state.prd_job = None
+    st.session_state.response_data = response.model_dump()
+    st.session_state.prd_request = request.model_dump()
+    st.session_state.prd_request_deadline = deadline
+    st.session_state.prd_generated = True
+    st.session_state.prd_error = None
+    st.session_state.product_idea = request.product_idea
+    st.session_state.target_audience = request.target_audience
+    st.session_state.timeline = request.timeline
 
 st.title("🤖 Gaia Multi-Agent PRD Generator")
 st.markdown("Get product insights from AI versions of legendary entrepreneurs")
@@ -252,20 +186,121 @@ st.markdown("Get product insights from AI versions of legendary entrepreneurs")
 st.sidebar.header("🤖 Advisory Panel Selection")
 st.sidebar.markdown("Choose which AI advisors to consult:")
 
-agent_configs = {
-    "elon": {"name": "🚀 Elon Musk AI", "desc": "Innovation & Scaling", "port": 8001},
-    "warren": {"name": "💰 Warren Buffet AI", "desc": "Business Fundamentals", "port": 8002},
-    "peter": {"name": "🎯 Peter Thiel AI", "desc": "Strategy & Monopoly", "port": 8003},
-    "steve": {"name": "🎨 Steve Jobs AI", "desc": "Design & Experience", "port": 8004}
-}
-
 selected_agents = {}
-for key, config in agent_configs.items():
+unreachable = []
+for key, advisor in advisors.items():
+    status = health.advisor_status(key)
+    widget = f"advisor_{key}"
+    down = status.state == DOWN
+    # Deselect an advisor while its nodes are down and reselect it once they recover
+    if widget not in st.session_state:
+        st.session_state[widget] = not down
+    elif down != st.session_state.get(f"{widget}_down", False):
+        st.session_state[widget] = not down
+    st.session_state[f"{widget}_down"] = down
+    if down:
+        unreachable.append(advisor.name)
+    badge = health_badge(status)
     selected_agents[key] = st.sidebar.checkbox(
-        f"{config['name']}", 
-        value=True, 
-        help=f"Expertise: {config['desc']}"
+        f"{advisor.label} · {badge}" if badge else advisor.label,
+        key=widget,
+        help=f"Expertise: {advisor.focus}" + (f"\n\nLast problem: {status.error}" if status.error else "")
+    )
+if unreachable:
+    st.sidebar.caption(
+        f"🔴 {', '.join(unreachable)} AI could not be reached and "
+        + ("was deselected until it recovers." if len(unreachable) == 1 else "were deselected until they recover.")
     )
+if advisors.error:
+    st.sidebar.warning(f"⚠️ Advisor file not reloaded, keeping the previous panel: {advisors.error}")
+
+with st.sidebar:
+    st.markdown("### ⚡ Response Cache")
+    bypass_cache = st.checkbox(
+        "Bypass cache",
+        value=False,
+        help="Ask every advisor again instead of reusing a stored analysis for the same prompt"
+    )
+    reuse_similar = st.checkbox(
+        "♻️ Reuse near-duplicate ideas",
+        value=semantic_cache.enabled,
+        disabled=bypass_cache,
+        help="Answer a reworded idea with the stored analysis of a very similar earlier one instead of asking again"
+    )
+    similarity_threshold = st.slider(
+        "Minimum similarity",
+        min_value=semantic_cache.min_threshold,
+        max_value=0.99,
+        value=semantic_cache.threshold,
+        step=0.01,
+        disabled=bypass_cache or not reuse_similar,
+        help="Lower reuses more aggressively, at the risk of reusing an analysis of a genuinely different idea"
+    )
+    if semantic_cache.error:
+        st.warning(f"Near-duplicate reuse is off: {semantic_cache.error}")
+    elif not semantic_cache.paraphrases:
+        st.caption("Only near-verbatim rewordings are reused. Set `GAIA_EMBEDDINGS_FILE` to reuse paraphrases.")
+    cache_stats = response_cache.stats()
+    st.caption(
+        f"{cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+        f"{cache_stats['hit_rate']:.0%} hit rate · {cache_stats['entries']} entries · "
+        f"{inflight.coalesced} coalesced · {semantic_cache.hits} reused"
+    )
+
+    st.markdown("### ⏱️ Response Deadline")
+    prd_deadline = st.slider(
+        "Finish PRD after (seconds)",
+        min_value=10,
+        max_value=120,
+        value=90,
+        step=5,
+        help="Advisors still working at the deadline are marked as pending; re-submit later to pick up their cached answers"
+    )
+
+    st.markdown("### 📏 Output Length")
+    output_mode = st.radio(
+        "Advisor analyses",
+        MODES,
+        format_func=lambda mode: {"full": "Full", "brief": "Brief (quick draft)"}.get(mode, mode),
+        horizontal=True,
+        help="Brief asks each advisor for "
+             f"{budgets['brief'].words} instead of {budgets['full'].words}: much faster and cheaper, good for drafts"
+    )
+
+    st.markdown("### 🗣️ Advisor Debate")
+    debate = st.checkbox(
+        "Debate before writing the PRD",
+        value=False,
+        help="Advisors read summaries of each other's analyses and refine their own, then a synthesis agent writes "
+             "the recommendations. Roughly doubles the advisor calls; each refinement starts as soon as its inputs are ready"
+    )
+
+    show_debug = st.checkbox(
+        "🔬 Show debug panel",
+        value=False,
+        help="Per-advisor timings, status codes, token usage and a waterfall of the concurrent calls"
+    )
+
+if history is not None:
+    with st.sidebar:
+        st.markdown("### 🗂️ PRD History")
+        history_query = st.text_input(
+            "Search past PRDs",
+            placeholder="e.g. pet owners",
+            help="Matches product ideas, audiences and PRD text; click a result to reload it instantly"
+        )
+        entries = history.search(history_query, limit=8)
+        st.caption(f"{history.count(history_query)} saved PRD(s)" + (" match" if history_query else ""))
+        for entry in entries:
+            when = time.strftime("%b %d, %H:%M", time.localtime(entry.created_at))
+            st.button(
+                f"📄 {entry.product_idea[:40]}{'...' if len(entry.product_idea) > 40 else ''}",
+                key=f"history_{entry.response_id}",
+                help=f"{when} · {len(entry.agents)} advisor(s)" + (f"\n\n{entry.highlighted()}" if entry.snippet else ""),
+                on_click=load_history_entry,
+                args=(entry.response_id,),
+                width="stretch"
+            )
 
 with st.sidebar:
     st.markdown("### 📚 Tips for Better Results")
@@ -278,23 +313,19 @@ with st.sidebar:
     - Specify technical requirements or constraints
     
     **Using the Advisory Panel:**
-    - **Elon Musk AI**: Best for innovative, scalable, tech-forward products
-    - **Warren Buffet AI**: Focus on business fundamentals and long-term viability
-    - **Peter Thiel AI**: Strategic insights for competitive differentiation
-    - **Steve Jobs AI**: User experience and design excellence
-    """)
+    """ + "\n".join(f"- **{advisor.name} AI**: {advisor.tip}" for advisor in advisors.values() if advisor.tip))
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("**Built by [Harish Kotra](https://tini.ltd/hk) from Gaia** 🚀")
 
 st.markdown("### Selected Advisory Panel:")
-cols = st.columns(4)
-for i, (key, config) in enumerate(agent_configs.items()):
+cols = st.columns(len(advisors))
+for i, (key, advisor) in enumerate(advisors.items()):
     with cols[i]:
-        if selected_agents[key]:
-            st.markdown(f"**{config['name']}**\n\n{config['desc']}")
+        if selected_agents.get(key):
+            st.markdown(f"**{advisor.label}**\n\n{advisor.focus}")
         else:
-            st.markdown(f"~~**{config['name']}**~~\n*Disabled*")
+            st.markdown(f"~~**{advisor.label}**~~\n*Disabled*")
 
 st.subheader("💡 Example Prompts")
 st.markdown("Click any example to auto-fill the product idea field:")
@@ -327,6 +358,14 @@ if 'prd_generated' not in st.session_state:
     st.session_state.prd_generated = False
 if 'response_data' not in st.session_state:
     st.session_state.response_data = None
+if 'prd_job' not in st.session_state:
+    st.session_state.prd_job = None
+    st.session_state.prd_job_agents = {}
+if 'prd_error' not in st.session_state:
+    st.session_state.prd_error = None
+if 'session_id' not in st.session_state:
+    # Upstream calls are shared fairly between browser sessions
+    st.session_state.session_id = uuid.uuid4().hex
 
 # Input form
 with st.form("prd_form"):
@@ -369,146 +408,152 @@ if submitted and product_idea:
     if selected_count == 0:
         st.error("Please select at least one advisor from the sidebar!")
     else:
-        with st.spinner(f"Consulting {selected_count} advisor(s) (this may take 1-2 minutes)..."):
-            try:
-                # Create Pydantic request object
-                prd_request = PRDRequest(
-                    product_idea=product_idea,
-                    target_audience=target_audience,
-                    timeline=timeline,
-                    budget_range=budget_range
-                )
-                
-                # Generate PRD using async function with Pydantic models
-                response: PRDResponse = asyncio.run(generate_prd(prd_request, selected_agents))
-                
-                # Convert Pydantic model to dict for session state
-                st.session_state.response_data = response.model_dump()
-                st.session_state.prd_generated = True
-                st.session_state.product_idea = product_idea
-                st.session_state.target_audience = target_audience
-                st.session_state.timeline = timeline
-                
-            except Exception as e:
-                st.error(f"Error generating PRD: {e}")
+        # Create Pydantic request object
+        prd_request = PRDRequest(
+            product_idea=product_idea,
+            target_audience=target_audience,
+            timeline=timeline,
+            budget_range=budget_range
+        )
+        
+        # A new submission replaces one that is still running for this session
+        if st.session_state.prd_job is not None:
+            st.session_state.prd_job.cancel()
+        
+        # Run on the shared background loop so the script thread is free and the
+        # work survives reruns; the live panel below polls it until it is done
+        job_agents = dict(selected_agents)
+        st.session_state.prd_job = start(lambda on_update: generate_prd(
+            prd_request,
+            job_agents,
+            on_update=on_update,
+            use_cache=not bypass_cache,
+            deadline=prd_deadline,
+            session_id=st.session_state.session_id,
+            similarity=similarity_threshold if reuse_similar else None,
+            debate=debate,
+            mode=output_mode
+        ))
+        st.session_state.prd_job_agents = job_agents
+        st.session_state.prd_job_request = prd_request.model_dump()
+        st.session_state.prd_job_deadline = prd_deadline
+        st.session_state.prd_error = None
+        st.session_state.product_idea = product_idea
+        st.session_state.target_audience = target_audience
+        st.session_state.timeline = timeline
 
 elif submitted and not product_idea:
     st.warning("Please enter a product idea to get started!")
 
+@st.fragment(run_every=0.5 if st.session_state.prd_job is not None else None)
+def render_live_job():
+    """Poll the running PRD job and preview partial analyses as they stream in"""
+    job = st.session_state.prd_job
+    if job is None:
+        return
+    
+    if job.done():
+        st.session_state.prd_job = None
+        try:
+            response: PRDResponse = job.result()
+        except Exception as e:
+            st.session_state.prd_error = f"Error generating PRD: {e}"
+        else:
+            # Convert Pydantic model to dict for session state
+            st.session_state.response_data = response.model_dump()
+            st.session_state.prd_request = st.session_state.prd_job_request
+            st.session_state.prd_request_deadline = st.session_state.prd_job_deadline
+            st.session_state.prd_generated = True
+            if history is not None:
+                history.record(
+                    PRDRequest(**st.session_state.prd_job_request),
+                    response,
+                    elapsed=job.elapsed,
+                    session_id=st.session_state.session_id,
+                    deadline=st.session_state.prd_job_deadline
+                )
+        st.rerun()
+    
+    job_agents = st.session_state.prd_job_agents
+    partial = job.partial()
+    finished = sum(1 for key in job_agents if job_agents[key] and key in partial)
+    st.info(
+        f"⏳ Consulting {sum(job_agents.values())} advisor(s) for {job.elapsed:.0f}s "
+        f"({finished} reporting so far). You can keep using the page while they work."
+    )
+    queue_stats = scheduler.stats(st.session_state.session_id).values()
+    waiting = sum(stats["queued"] for stats in queue_stats)
+    if waiting:
+        mine = sum(stats["session_queued"] for stats in queue_stats)
+        wait = max(stats["estimated_wait"] for stats in queue_stats if stats["session_queued"]) if mine else 0
+        st.caption(
+            f"🚦 Advisor nodes are busy: {waiting} call(s) queued, {mine} of them yours"
+            + (f" · estimated wait ~{wait:.0f}s" if mine else "")
+        )
+    if st.button("✋ Cancel"):
+        job.cancel()
+        st.session_state.prd_job = None
+        st.rerun()
+    
+    st.subheader("📋 Product Requirements Document")
+    st.markdown("## Advisory Panel Analysis")
+    for key in advisory_titles:
+        if job_agents.get(key) and partial.get(key):
+            st.markdown(f"### {advisory_titles[key]}\n{partial[key]}")
+    for key in advisory_titles:
+        if job_agents.get(key) and partial.get(key):
+            with st.expander(advisors[key].analysis_title, expanded=False):
+                st.markdown(partial[key])
+    if partial.get("synthesis"):
+        st.markdown(f"## Synthesis & Recommendations\n{partial['synthesis']}")
+
+render_live_job()
+
+if st.session_state.prd_error:
+    st.error(st.session_state.prd_error)
+
 # Display results if available
-if st.session_state.prd_generated and st.session_state.response_data:
+if st.session_state.prd_generated and st.session_state.response_data and st.session_state.prd_job is None:
     data = st.session_state.response_data
     
     # Display PRD with download options
     st.subheader("📋 Product Requirements Document")
     
-    prd_content = data.get("prd", "No PRD generated")
-    
-    # PRD download/copy options
-    col1, col2 = st.columns([3, 1])
-    with col2:
-        # Download PRD as markdown file
-        st.download_button(
-            label="📥 Download PRD",
-            data=prd_content,
-            file_name=f"PRD_{st.session_state.product_idea.replace(' ', '_')[:30]}.md",
-            mime="text/markdown"
+    if data.get("pending"):
+        pending_names = ", ".join(agents[key].name for key in data["pending"] if key in agents)
+        st.warning(f"⏳ Still waiting on {pending_names}. Submit again shortly to include their (cached) analysis.")
+    for key, error in data.get("errors", {}).items():
+        if key in agents:
+            st.error(f"⚠️ {agents[key].name} AI failed: {error}")
+    reused = {key: reuse for key, reuse in data.get("reused", {}).items() if key in advisors}
+    if reused:
+        st.info(
+            "♻️ Some analyses were **reused** from similar earlier ideas instead of asking again. "
+            "Tick **Bypass cache** for fresh ones.\n"
+            + "\n".join(
+                f"- **{advisors[key].name} AI** ({reuse['similarity']:.0%} similar): “{reuse['idea'][:160]}”"
+                for key, reuse in reused.items()
+            )
         )
     
-    with col1:
-        st.markdown(prd_content)
-    
-    # Show PRD content in expandable text area for easy copying
-    with st.expander("📋 Copy PRD Content (Click to expand, then Ctrl+A to select all)"):
-        st.text_area(
-            "PRD Content for Copying:",
-            value=prd_content,
-            height=300,
-            help="Click in this text area, then use Ctrl+A to select all and Ctrl+C to copy"
-        )
+    render_prd_panel(data)
     
     # Display Development Prompt with enhanced content and copy options  
     st.subheader("⚡ Development Prompt for AI Platforms")
-    
-    # Enhanced dev prompt with AI insights
-    ai_insights = ""
-    
-    if selected_agents.get("elon") and data.get("elon_analysis"):
-        ai_insights += f"""**🚀 Innovation Perspective (Elon Musk):**
-{data.get("elon_analysis", "")[:500]}...
-
-"""
-    
-    if selected_agents.get("warren") and data.get("warren_analysis"):
-        ai_insights += f"""**💰 Business Perspective (Warren Buffet):**
-{data.get("warren_analysis", "")[:500]}...
-
-"""
-    
-    if selected_agents.get("peter") and data.get("peter_analysis"):
-        ai_insights += f"""**🎯 Strategic Perspective (Peter Thiel):**
-{data.get("peter_analysis", "")[:500]}...
-
-"""
-    
-    if selected_agents.get("steve") and data.get("steve_analysis"):
-        ai_insights += f"""**🎨 Design Perspective (Steve Jobs):**
-{data.get("steve_analysis", "")[:500]}...
-
-"""
-    
-    enhanced_dev_prompt = data.get("dev_prompt", "") + f"""
-
-## AI Advisory Insights for Implementation
-
-{ai_insights}
-## Implementation Priority
-1. Start with core functionality that delivers immediate value
-2. Focus on user experience and interface design
-3. Build scalable architecture from day one
-4. Implement analytics to track key metrics
-5. Plan for iterative improvements based on user feedback
-
-**Copy this entire prompt and paste it into v0.dev, bolt.new, or lovable.dev for best results.**"""
-    
-    # Dev prompt copy options
-    col1, col2 = st.columns([3, 1])
-    with col2:
-        # Download enhanced dev prompt
-        st.download_button(
-            label="📥 Download Prompt",
-            data=enhanced_dev_prompt,
-            file_name=f"DevPrompt_{st.session_state.product_idea.replace(' ', '_')[:30]}.md",
-            mime="text/markdown"
-        )
-    
-    with col1:
-        st.code(enhanced_dev_prompt, language="markdown")
-    
-    # Show dev prompt in expandable text area for easy copying
-    with st.expander("📋 Copy Development Prompt (Click to expand, then Ctrl+A to select all)"):
-        st.text_area(
-            "Development Prompt for Copying:",
-            value=enhanced_dev_prompt,
-            height=400,
-            help="Click in this text area, then use Ctrl+A to select all and Ctrl+C to copy"
-        )
-    
-    st.info("💡 **Tip:** Use the expandable text areas above to easily copy the PRD or development prompt. Click to expand, then Ctrl+A to select all and Ctrl+C to copy!")
-    
-    # Individual analyses in expanders (only for selected agents)
-    if selected_agents.get("elon") and data.get("elon_analysis"):
-        with st.expander("🚀 Elon Musk's Innovation Analysis"):
-            st.markdown(data.get("elon_analysis"))
-    
-    if selected_agents.get("warren") and data.get("warren_analysis"):
-        with st.expander("💰 Warren Buffet's Business Analysis"):
-            st.markdown(data.get("warren_analysis"))
-    
-    if selected_agents.get("peter") and data.get("peter_analysis"):
-        with st.expander("🎯 Peter Thiel's Strategic Analysis"):
-            st.markdown(data.get("peter_analysis"))
-    
-    if selected_agents.get("steve") and data.get("steve_analysis"):
-        with st.expander("🎨 Steve Jobs' Design Analysis"):
-            st.markdown(data.get("steve_analysis"))
\ No newline at end of file
+    render_dev_prompt_panel(data)
+    
+    st.info("💡 **Tip:** Use the copy icon on the development prompt, or switch the PRD to **Raw markdown** to copy it!")
+    
+    # Individual analyses in expanders (for the advisors consulted for this PRD)
+    for key in data.get("agents", []):
+        if key in advisors and data["analyses"].get(key):
+            reused = " ♻️ (reused)" if key in data.get("reused", {}) else ""
+            refined = " 🗣️ (refined after debate)" if key in data.get("refined", []) else ""
+            with st.expander(advisors[key].analysis_title + reused + refined):
+                st.markdown(data["analyses"][key])
+                if refined:
+                    st.caption("First-round analysis, before reading the other advisors:")
+                    st.markdown(data["initial_analyses"].get(key, ""))
+    
+    if show_debug and data.get("calls"):
+        render_debug_panel(data["calls"])
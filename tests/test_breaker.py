@@ -0,0 +1,179 @@
+import asyncio
+import socket
+import threading
+
+import httpx
+import pytest
+
+from gaia_prd import breaker as breaker_module
+from gaia_prd.agent import GaiaAgent
+from gaia_prd.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, breakers, call_with_retry
+from gaia_prd.runtime import run
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker_module.time, "monotonic", clock)
+    return clock
+
+
+def tripped(clock: Clock) -> CircuitBreaker:
+    breaker = CircuitBreaker("http://node", window=60, min_calls=4, failure_rate=0.5, cooldown=30)
+    for _ in range(4):
+        breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_once_failure_rate_crosses_threshold(clock):
+    breaker = CircuitBreaker("http://node", window=60, min_calls=4, failure_rate=0.5, cooldown=30)
+    for ok in (True, True, False):
+        breaker.allow()
+        breaker.record_success() if ok else breaker.record_failure()
+    assert breaker.state == CLOSED  # below min_calls
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = CircuitBreaker("http://node", window=60, min_calls=4, failure_rate=0.5, cooldown=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 61
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_single_probe_after_cooldown(clock):
+    breaker = tripped(clock)
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    clock.now += 2
+    assert breaker.allow() is True
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()  # the probe is still out
+
+
+def test_probe_success_closes(clock):
+    breaker = tripped(clock)
+    clock.now += 31
+    probe = breaker.allow()
+    breaker.record_success(probe)
+    assert breaker.state == CLOSED
+    assert breaker.allow() is False
+
+
+def test_probe_failure_reopens(clock):
+    breaker = tripped(clock)
+    clock.now += 31
+    probe = breaker.allow()
+    breaker.record_failure(probe)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_only_the_probe_frees_the_probe_slot(clock):
+    breaker = CircuitBreaker("http://node", window=60, min_calls=4, failure_rate=0.5, cooldown=30)
+    # A call let through while closed is still running when the breaker trips
+    early = breaker.allow()
+    for _ in range(4):
+        breaker.record_failure()
+    clock.now += 31
+    probe = breaker.allow()
+    assert (early, probe) == (False, True)
+    breaker.release(early)
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.release(probe)
+    assert breaker.allow() is True
+
+
+def status_error(code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://node")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(code, request=request))
+
+
+def test_retries_and_429_does_not_count(monkeypatch):
+    monkeypatch.setattr(breaker_module, "backoff_delay", lambda *args: 0)
+    endpoint = "http://retry-429.test"
+    errors = [status_error(429), status_error(503)]
+
+    async def fn():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert asyncio.run(call_with_retry(endpoint, fn, retries=2)) == "ok"
+    outcomes = [ok for _, ok in breakers.get(endpoint)._outcomes]
+    assert outcomes == [False, True]  # the 503 and the success, not the 429
+
+
+def test_cancelled_probe_gives_back_its_slot(clock):
+    endpoint = "http://cancelled-probe.test"
+    breaker = breakers.get(endpoint)
+    breaker.state, breaker.opened_at = OPEN, clock.now - breaker.cooldown - 1
+
+    async def main():
+        task = asyncio.ensure_future(call_with_retry(endpoint, lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is True
+
+
+@pytest.fixture
+def hanging_node():
+    """An endpoint that accepts connections and never answers"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(100)
+    connections = []
+
+    def accept():
+        while True:
+            try:
+                connections.append(server.accept())
+            except OSError:
+                return
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield f"http://127.0.0.1:{server.getsockname()[1]}/v1/chat/completions"
+    server.close()
+    for connection, _ in connections:
+        connection.close()
+
+
+def test_hard_deadline_abandons_open_the_breaker(hanging_node):
+    breaker = breakers.get(hanging_node)
+    agent = GaiaAgent("Hanging", hanging_node, "test", soft_deadline=5, hard_deadline=0.2)
+    for number in range(breaker.min_calls):
+        response = run(agent.complete(f"idea {number}", use_cache=False))
+        assert response.error == "no response within 0.2s"
+    assert breaker.state == OPEN
+
+
+def test_every_abandoned_attempt_counts():
+    endpoint = "http://abandoned.test"
+    breaker = breakers.get(endpoint)
+    # Two attempts on one endpoint (e.g. a retry and a hedge) do not collide
+    GaiaAgent._abandon({object(): endpoint, object(): endpoint})
+    assert [ok for _, ok in breaker._outcomes] == [False, False]
@@ -0,0 +1,86 @@
+import asyncio
+
+from gaia_prd.debate import Graph, peers_of, summary_budget
+
+
+def test_nodes_start_when_their_own_dependencies_finish():
+    async def main():
+        graph, log, slow = Graph(), [], asyncio.Event()
+
+        def node(name, wait=None):
+            async def run(inputs):
+                log.append(f"start {name}")
+                if wait is not None:
+                    await wait.wait()
+                log.append(f"end {name}")
+                return name
+
+            return run
+
+        graph.add("slow", node("slow", slow))
+        graph.add("fast", node("fast"))
+        refined = graph.add("refined", node("refined"), after=["fast"])
+        # No barrier: the refinement finishes while the slow call is still running
+        await refined
+        assert "end slow" not in log
+        slow.set()
+        await asyncio.gather(*graph.tasks.values())
+        return log
+
+    log = asyncio.run(main())
+    assert log.index("end fast") < log.index("start refined") < log.index("end slow")
+
+
+def test_failed_dependencies_drop_out_of_the_inputs():
+    async def main():
+        graph = Graph()
+
+        async def ok(inputs):
+            return "ok"
+
+        async def fail(inputs):
+            raise RuntimeError("node down")
+
+        async def join(inputs):
+            return inputs
+
+        graph.add("ok", ok)
+        graph.add("fail", fail)
+        return await graph.add("join", join, after=["ok", "fail"])
+
+    assert asyncio.run(main()) == {"ok": "ok"}
+
+
+def test_dependents_receive_results_by_node():
+    async def main():
+        graph = Graph()
+
+        def constant(value):
+            async def run(inputs):
+                return value
+
+            return run
+
+        async def total(inputs):
+            return sorted(inputs.items())
+
+        graph.add("a", constant(1))
+        graph.add("b", constant(2))
+        graph.add("sum", total, after=["a", "b"])
+        graph.add("last", total, after=["sum"])
+        return await graph.tasks["last"]
+
+    assert asyncio.run(main()) == [("sum", [("a", 1), ("b", 2)])]
+
+
+def test_peers_are_the_next_neighbours_wrapping_around():
+    panel = ["a", "b", "c", "d"]
+    assert peers_of("a", panel, 2) == ["b", "c"]
+    assert peers_of("d", panel, 2) == ["a", "b"]
+    assert peers_of("c", panel, 0) == ["d", "a", "b"]
+    assert peers_of("b", panel, 10) == ["c", "d", "a"]
+
+
+def test_summary_budget_has_a_floor():
+    assert summary_budget(1) > summary_budget(3)
+    assert summary_budget(1000) == summary_budget(10000)
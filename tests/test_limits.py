@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+
+from gaia_prd.limits import EndpointScheduler, FairScheduler, current_session
+
+
+async def admitted_order(scheduler: EndpointScheduler, calls, weights=None):
+    """Sessions in the order their queued ``calls`` are admitted, one at a time"""
+    weights = weights or {}
+    await scheduler.acquire("holder")
+    order = []
+
+    async def call(session):
+        await scheduler.acquire(session, weights.get(session, 1))
+        order.append(session)
+        await asyncio.sleep(0)
+        scheduler.release()
+
+    tasks = []
+    for session in calls:
+        tasks.append(asyncio.ensure_future(call(session)))
+        await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_sessions_take_turns():
+    order = asyncio.run(admitted_order(EndpointScheduler("http://node", 1), ["a", "a", "a", "b", "c"]))
+    assert order == ["a", "b", "c", "a", "a"]
+
+
+def test_weights_grant_calls_in_a_row():
+    calls = ["a", "a", "a", "a", "b", "b"]
+    order = asyncio.run(admitted_order(EndpointScheduler("http://node", 1), calls, {"a": 2}))
+    assert order == ["a", "a", "b", "a", "a", "b"]
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        scheduler = EndpointScheduler("http://node", 1)
+        await scheduler.acquire("holder")
+        waiter = asyncio.ensure_future(scheduler.acquire("a"))
+        await asyncio.sleep(0)
+        assert scheduler.stats("a") == {"active": 1, "queued": 1, "session_queued": 1, "estimated_wait": 1.0}
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.queued == 0
+        scheduler.release()
+        assert scheduler.active == 0
+
+    asyncio.run(main())
+
+
+def test_stats_are_summed_across_event_loops():
+    scheduler = FairScheduler(concurrency=1)
+    done = threading.Event()
+
+    async def session():
+        current_session.set("s1")
+
+        async def call():
+            async with scheduler.slot("http://node"):
+                await asyncio.to_thread(done.wait)
+
+        await asyncio.gather(call(), call())
+
+    # One loop per thread, each with a call running and one queued
+    threads = [threading.Thread(target=asyncio.run, args=(session(),)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    try:
+        deadline = time.monotonic() + 5
+        while scheduler.stats("s1").get("http://node", {}).get("queued") != 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = scheduler.stats("s1")["http://node"]
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+    assert (stats["active"], stats["queued"], stats["session_queued"]) == (2, 2, 2)
+    assert scheduler.stats()["http://node"]["active"] == 0
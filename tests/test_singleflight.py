@@ -0,0 +1,118 @@
+import asyncio
+
+from gaia_prd.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    async def main():
+        flight, calls, release = SingleFlight(), [], asyncio.Event()
+
+        async def fn(publish):
+            calls.append(1)
+            await release.wait()
+            return "result"
+
+        waiters = [asyncio.ensure_future(flight.do("key", fn)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        return results, calls, flight
+
+    results, calls, flight = asyncio.run(main())
+    assert results == ["result"] * 3
+    assert len(calls) == 1
+    assert (flight.started, flight.coalesced, flight.in_flight()) == (1, 2, 0)
+
+
+def test_partial_results_fan_out_and_replay():
+    async def main():
+        flight, step = SingleFlight(), asyncio.Event()
+        first, late = [], []
+
+        async def fn(publish):
+            publish("one")
+            await step.wait()
+            publish("one two")
+            return "one two three"
+
+        leader = asyncio.ensure_future(flight.do("key", fn, first.append))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", fn, late.append))
+        await asyncio.sleep(0)
+        step.set()
+        await asyncio.gather(leader, follower)
+        return first, late
+
+    first, late = asyncio.run(main())
+    assert first == ["one", "one two", "one two three"]
+    # Joined late: replayed the latest partial, then followed along
+    assert late == ["one", "one two", "one two three"]
+
+
+def test_cancelled_waiter_does_not_cancel_the_call():
+    async def main():
+        flight, release, updates = SingleFlight(), asyncio.Event(), []
+
+        async def fn(publish):
+            await release.wait()
+            publish("partial")
+            return "result"
+
+        leaver = asyncio.ensure_future(flight.do("key", fn, updates.append))
+        stayer = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0)
+        leaver.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await stayer == "result"
+        assert leaver.cancelled()
+        return updates
+
+    # The cancelled waiter stopped listening
+    assert asyncio.run(main()) == []
+
+
+def test_errors_reach_every_waiter_and_the_key_is_retried():
+    async def main():
+        flight, attempts = SingleFlight(), []
+
+        async def fn(publish):
+            attempts.append(1)
+            await asyncio.sleep(0)
+            if len(attempts) == 1:
+                raise RuntimeError("upstream failed")
+            return "result"
+
+        waiters = [asyncio.ensure_future(flight.do("key", fn)) for _ in range(2)]
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert [str(result) for result in results] == ["upstream failed"] * 2
+        return await flight.do("key", fn)
+
+    assert asyncio.run(main()) == "result"
+
+
+def test_flights_are_per_event_loop():
+    flight = SingleFlight()
+
+    async def fn(publish):
+        await asyncio.sleep(0)
+        return "result"
+
+    assert asyncio.run(flight.do("key", fn)) == "result"
+    assert asyncio.run(flight.do("key", fn)) == "result"
+    assert (flight.started, flight.coalesced) == (2, 0)
+
+
+def test_different_keys_do_not_coalesce():
+    async def main():
+        flight = SingleFlight()
+
+        async def fn(publish):
+            await asyncio.sleep(0)
+            return "result"
+
+        await asyncio.gather(flight.do("a", fn), flight.do("b", fn))
+        return flight
+
+    flight = asyncio.run(main())
+    assert (flight.started, flight.coalesced) == (2, 0)